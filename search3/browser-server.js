@@ -0,0 +1,77 @@
+require('dotenv').config();
+const { chromium } = require('playwright');
+
+/**
+ * 本地启动多个常驻浏览器服务（launchServer），供 Python 抓取服务通过
+ * BROWSER_WS_ENDPOINTS 连接。
+ *
+ * 用法:
+ *   node browser-server.js --count=2 --base-port=9300
+ *
+ * 注意：Python 端 playwright 版本需与本项目 playwright 版本一致。
+ */
+class BrowserServerLauncher {
+  constructor(options = {}) {
+    this.count = options.count || 1;
+    this.basePort = options.basePort || 9300;
+    this.host = options.host || '127.0.0.1';
+    this.servers = [];
+  }
+
+  async start() {
+    for (let i = 0; i < this.count; i++) {
+      const port = this.basePort + i;
+      const server = await chromium.launchServer({
+        host: this.host,
+        port,
+        wsPath: `browser-${i}`,
+        executablePath: process.env.BROWSER_PATH,
+        headless: process.env.HEADLESS === 'true' || false,
+        args: [
+          '--no-sandbox',
+          '--disable-setuid-sandbox',
+          '--disable-dev-shm-usage',
+          '--disable-accelerated-2d-canvas',
+          '--no-first-run',
+          '--no-zygote',
+          '--disable-gpu',
+        ],
+      });
+      this.servers.push(server);
+      console.log(`Browser server ${i} listening on ${server.wsEndpoint()}`);
+    }
+
+    const endpoints = this.servers.map(server => server.wsEndpoint()).join(',');
+    console.log(`\nexport BROWSER_WS_ENDPOINTS=${endpoints}`);
+  }
+
+  async stop() {
+    await Promise.all(this.servers.map(server => server.close()));
+    this.servers = [];
+    console.log('Browser servers stopped');
+  }
+}
+
+if (require.main === module) {
+  const getArg = (name) => process.argv.find(arg => arg.startsWith(`--${name}=`))?.split('=')[1];
+
+  const launcher = new BrowserServerLauncher({
+    count: parseInt(getArg('count')) || parseInt(process.env.BROWSER_SERVER_COUNT) || 1,
+    basePort: parseInt(getArg('base-port')) || parseInt(process.env.BROWSER_SERVER_BASE_PORT) || 9300,
+    host: getArg('host') || process.env.BROWSER_SERVER_HOST,
+  });
+
+  const shutdown = async () => {
+    await launcher.stop();
+    process.exit(0);
+  };
+  process.on('SIGINT', shutdown);
+  process.on('SIGTERM', shutdown);
+
+  launcher.start().catch(error => {
+    console.error('Failed to start browser servers:', error);
+    process.exit(1);
+  });
+}
+
+module.exports = BrowserServerLauncher;
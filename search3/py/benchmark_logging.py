@@ -0,0 +1,131 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+from log_pipeline import LoggingPipeline, category_logger, new_trace_id
+
+CALLS_PER_REQUEST = 5
+
+
+def log_request_before(logger: logging.Logger, i: int):
+    """原实现：每个请求的热路径日志，f-string 立即格式化"""
+    word = f"word{i}"
+    logger.info(f"Processing scrape request for: {word}")
+    logger.info(f"Request count: {i}/500")
+    logger.info(f"Using page (used {i % 20 + 1}/20 times) for: {word}")
+    logger.info(f"Concurrency: {i % 35}/35, Queued: {i % 7}")
+    logger.info(f"Scrape result for {word}: {1234.5}ms")
+
+
+def make_log_request_after(name: str):
+    """新实现：分类 logger + 延迟格式化"""
+    request_log = category_logger(name, "request")
+    page_log = category_logger(name, "page")
+    concurrency_log = category_logger(name, "concurrency")
+
+    def log_request_after(logger: logging.Logger, i: int):
+        word = f"word{i}"
+        new_trace_id()
+        request_log.info("Processing scrape request for: %s", word)
+        request_log.info("Request count: %d/%d", i, 500)
+        page_log.info("Using page (used %d/%d times) for: %s", i % 20 + 1, 20, word)
+        concurrency_log.info("Concurrency: %d/%d, Queued: %d", i % 35, 35, i % 7)
+        request_log.info("Scrape result for %s: %sms", word, 1234.5)
+
+    return log_request_after
+
+
+def _run(log_request, logger: logging.Logger, requests: int, finish=None) -> Dict:
+    """调用方（事件循环线程）耗时，以及包含后台写线程在内的进程 CPU 时间"""
+    wall, cpu, process_cpu = time.perf_counter(), time.thread_time(), time.process_time()
+    for i in range(requests):
+        log_request(logger, i)
+    stats = {
+        "per_request_us": (time.perf_counter() - wall) / requests * 1e6,
+        "caller_cpu_us": (time.thread_time() - cpu) / requests * 1e6,
+    }
+    if finish:
+        finish()
+    stats["process_cpu_us"] = (time.process_time() - process_cpu) / requests * 1e6
+    return stats
+
+
+def _count_lines(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def benchmark(requests: int = 20000) -> Dict:
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    results = {}
+
+    # 原 server.py 未配置日志：根 logger 为 WARNING，INFO 日志在级别判断处被丢弃
+    root.setLevel(logging.WARNING)
+    results["unconfigured"] = _run(log_request_before, logging.getLogger("benchmark.unconfigured"), requests)
+    results["unconfigured"]["lines"] = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 同步文件处理器输出全部 INFO
+        sync_file = os.path.join(tmp, "sync.log")
+        handler = logging.FileHandler(sync_file, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        results["sync"] = _run(log_request_before, logging.getLogger("benchmark.sync"), requests)
+        root.removeHandler(handler)
+        handler.close()
+        results["sync"]["lines"] = _count_lines(sync_file)
+
+        # 日志管道：不采样（全部写出）和默认采样限流
+        for name, options in (
+            ("queued", {"sample_rates": {}, "rate_limits": {}}),
+            ("sampled", {}),
+        ):
+            log_file = os.path.join(tmp, f"{name}.log")
+            pipeline = LoggingPipeline({"file": log_file, "queue_size": requests * CALLS_PER_REQUEST, **options})
+            pipeline.start()
+            logger_name = f"benchmark.{name}"
+            stats = _run(make_log_request_after(logger_name), logging.getLogger(logger_name), requests, pipeline.stop)
+            stats["lines"] = _count_lines(log_file)
+            stats["pipeline"] = pipeline.get_stats()
+            results[name] = stats
+
+    root.setLevel(saved_level)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+
+    print("=" * 72)
+    print(f"Hot-path logging cost per request ({requests} requests, {CALLS_PER_REQUEST} log calls each)")
+    print("=" * 72)
+    print(f"{'':>12} {'caller wall':>12} {'caller CPU':>12} {'process CPU':>12} {'lines':>8}")
+    for name, stats in results.items():
+        print(
+            f"{name:>12} {stats['per_request_us']:>10.1f}us {stats['caller_cpu_us']:>10.1f}us "
+            f"{stats['process_cpu_us']:>10.1f}us {stats['lines']:>8}"
+        )
+
+    total_lines = requests * CALLS_PER_REQUEST
+    sync, queued, sampled = results["sync"], results["queued"], results["sampled"]
+    print(
+        f"\nPer written record: sync {sync['caller_cpu_us'] / CALLS_PER_REQUEST:.2f}us on the caller, "
+        f"queued {queued['caller_cpu_us'] / CALLS_PER_REQUEST:.2f}us on the caller "
+        f"(+{(queued['process_cpu_us'] - queued['caller_cpu_us']) / CALLS_PER_REQUEST:.2f}us in the writer thread)"
+    )
+    print(
+        f"Sampling kept {sampled['lines']} of {total_lines} records "
+        f"({sampled['lines'] / total_lines:.2%}); most of the sampled saving comes from dropped records"
+    )
+    print(
+        f"Unconfigured baseline (INFO discarded by level) costs "
+        f"{results['unconfigured']['caller_cpu_us']:.1f}us per request"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import time
+from typing import Dict
+from metrics import LatencyTracker
+from scraper import WebScraper
+
+
+async def benchmark(iterations: int = 20) -> Dict:
+    """对比页面原地复位与关闭重建的耗时（墙钟时间和本进程 CPU 时间）"""
+    scraper = WebScraper({"initial_page_pool_size": 1})
+    await scraper.initialize()
+
+    results = {
+        "recycle": {"wall": LatencyTracker(), "cpu": LatencyTracker()},
+        "recreate": {"wall": LatencyTracker(), "cpu": LatencyTracker()},
+    }
+
+    try:
+        page_obj = scraper.page_pool[0]
+
+        for i in range(iterations):
+            # 原地复位
+            scraper.page_status[page_obj["page"]] = "recycling"
+            wall, cpu = time.perf_counter(), time.process_time()
+            await scraper._recycle_page(page_obj)
+            results["recycle"]["wall"].record((time.perf_counter() - wall) * 1000)
+            results["recycle"]["cpu"].record((time.process_time() - cpu) * 1000)
+
+            # 关闭上下文并重新创建
+            wall, cpu = time.perf_counter(), time.process_time()
+            new_page = await scraper._create_page_with_proxy()
+            await scraper._close_page({"page": new_page})
+            results["recreate"]["wall"].record((time.perf_counter() - wall) * 1000)
+            results["recreate"]["cpu"].record((time.process_time() - cpu) * 1000)
+
+            print(f"iteration {i + 1}/{iterations} done")
+    finally:
+        await scraper.close()
+
+    report = {
+        mode: {name: tracker.get_stats() for name, tracker in trackers.items()}
+        for mode, trackers in results.items()
+    }
+
+    print("\n" + "=" * 60)
+    print("Page recycle vs re-creation (ms)")
+    print("=" * 60)
+    for mode, stats in report.items():
+        print(
+            f"{mode:>9}: wall mean {stats['wall']['mean']:.1f} "
+            f"p95 {stats['wall']['p95']:.1f} | cpu mean {stats['cpu']['mean']:.2f}"
+        )
+    speedup = report["recreate"]["wall"]["mean"] / report["recycle"]["wall"]["mean"]
+    print(f"Recycle is {speedup:.1f}x faster than re-creation")
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,181 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from playwright.async_api import Browser, Playwright
+import logging
+
+
+class BrowserConnectionPool:
+    """通过 WebSocket 连接到多个长期运行的浏览器服务（launchServer）
+
+    浏览器由 browser-server.js 等独立进程启动并常驻，Python 进程重启不会
+    影响浏览器本身。每个 endpoint 断开后会按指数退避自动重连。
+    """
+
+    def __init__(self, playwright: Playwright, endpoints: List[str], options: Dict = None):
+        options = options or {}
+
+        self.playwright = playwright
+        self.endpoints = endpoints
+        self.connect_timeout = options.get(
+            "connect_timeout", int(os.getenv("BROWSER_CONNECT_TIMEOUT", 10000))
+        )
+        self.reconnect_initial_delay = options.get("reconnect_initial_delay", 1.0)
+        self.reconnect_max_delay = options.get("reconnect_max_delay", 30.0)
+
+        # 连接状态
+        self.browsers: Dict[str, Browser] = {}
+        self.endpoint_stats: Dict[str, Dict] = {
+            endpoint: {
+                "connected": False,
+                "connects": 0,
+                "disconnects": 0,
+                "last_error": None,
+                "last_connected_at": None,
+            }
+            for endpoint in endpoints
+        }
+        self._reconnect_tasks: Dict[str, asyncio.Task] = {}
+        self._round_robin = 0
+        self._closing = False
+
+        # 断开 / 重连回调，由 WebScraper 注册
+        self.on_disconnect: Optional[Callable[[str], None]] = None
+        self.on_reconnect: Optional[Callable[[str], None]] = None
+
+        self._logger = logging.getLogger(__name__)
+
+    async def connect_all(self):
+        """连接所有浏览器服务，至少需要一个连接成功"""
+        results = await asyncio.gather(
+            *[self._connect(endpoint) for endpoint in self.endpoints],
+            return_exceptions=True,
+        )
+
+        for endpoint, result in zip(self.endpoints, results):
+            if isinstance(result, Exception):
+                self._schedule_reconnect(endpoint)
+
+        if not self.browsers:
+            raise Exception(
+                f"Failed to connect to any browser server: {', '.join(self.endpoints)}"
+            )
+
+        self._logger.info(
+            f"Connected to {len(self.browsers)}/{len(self.endpoints)} browser servers"
+        )
+
+    async def _connect(self, endpoint: str) -> Browser:
+        """连接单个浏览器服务"""
+        stats = self.endpoint_stats[endpoint]
+        try:
+            browser = await self.playwright.chromium.connect(
+                endpoint, timeout=self.connect_timeout
+            )
+            browser.on("disconnected", lambda _: self._handle_disconnected(endpoint, browser))
+
+            self.browsers[endpoint] = browser
+            stats["connected"] = True
+            stats["connects"] += 1
+            stats["last_error"] = None
+            stats["last_connected_at"] = datetime.now().isoformat()
+            self._logger.info(f"Connected to browser server: {endpoint}")
+            return browser
+
+        except Exception as e:
+            stats["connected"] = False
+            stats["last_error"] = str(e)
+            self._logger.error(f"Failed to connect to browser server {endpoint}: {e}")
+            raise
+
+    def _handle_disconnected(self, endpoint: str, browser: Browser):
+        """浏览器连接断开"""
+        if self.browsers.get(endpoint) is not browser:
+            return
+
+        self.browsers.pop(endpoint, None)
+        stats = self.endpoint_stats[endpoint]
+        stats["connected"] = False
+        stats["disconnects"] += 1
+
+        if self._closing:
+            return
+
+        self._logger.warning(f"Browser server disconnected: {endpoint}")
+        if self.on_disconnect:
+            self.on_disconnect(endpoint)
+        self._schedule_reconnect(endpoint)
+
+    def _schedule_reconnect(self, endpoint: str):
+        """调度后台重连"""
+        task = self._reconnect_tasks.get(endpoint)
+        if task and not task.done():
+            return
+        self._reconnect_tasks[endpoint] = asyncio.create_task(self._reconnect_loop(endpoint))
+
+    async def _reconnect_loop(self, endpoint: str):
+        """按指数退避重连直至成功"""
+        delay = self.reconnect_initial_delay
+        while not self._closing and endpoint not in self.browsers:
+            await asyncio.sleep(delay)
+            if self._closing:
+                return
+            try:
+                await self._connect(endpoint)
+                if self.on_reconnect:
+                    self.on_reconnect(endpoint)
+                return
+            except Exception:
+                delay = min(delay * 2, self.reconnect_max_delay)
+                self._logger.info(f"Retrying {endpoint} in {delay:.1f}s")
+
+    def get_browser(self, exclude: Optional[str] = None) -> Optional[Browser]:
+        """轮询选择一个已连接的浏览器"""
+        endpoints = [e for e in self.endpoints if e in self.browsers and e != exclude]
+        if not endpoints:
+            endpoints = [e for e in self.endpoints if e in self.browsers]
+        if not endpoints:
+            return None
+
+        endpoint = endpoints[self._round_robin % len(endpoints)]
+        self._round_robin += 1
+        return self.browsers[endpoint]
+
+    def endpoint_of(self, browser: Browser) -> Optional[str]:
+        """查找浏览器对应的 endpoint"""
+        for endpoint, connected in self.browsers.items():
+            if connected is browser:
+                return endpoint
+        return None
+
+    def is_connected(self) -> bool:
+        return bool(self.browsers)
+
+    async def close(self):
+        """断开所有连接（远端浏览器继续运行）"""
+        self._closing = True
+
+        for task in self._reconnect_tasks.values():
+            task.cancel()
+        self._reconnect_tasks.clear()
+
+        for browser in list(self.browsers.values()):
+            try:
+                await browser.close()
+            except Exception as e:
+                self._logger.error(f"Failed to disconnect browser: {e}")
+        self.browsers.clear()
+
+        for stats in self.endpoint_stats.values():
+            stats["connected"] = False
+
+        self._logger.info("Browser connection pool closed")
+
+    def get_status(self) -> Dict:
+        """获取连接池状态"""
+        return {
+            "connected": len(self.browsers),
+            "total": len(self.endpoints),
+            "endpoints": self.endpoint_stats,
+        }
@@ -0,0 +1,422 @@
+"""容量规划：扫描池大小、并发数和回收参数，拟合吞吐/延迟曲面并给出推荐配置
+
+用法：
+  # 针对本地服务（每组参数以对应环境变量重启 server.py）
+  python capacity_planner.py --max-concurrent 10,20,35 --pool-size 3,5,8 \\
+      --max-page-usage 20,50 --slo-p99 5000
+
+  # 针对模拟服务（验证规划流程，不启动浏览器）
+  python capacity_planner.py --stub
+
+  # 针对预发环境（无法重启，只能通过 PUT /concurrency 扫描并发数）
+  python capacity_planner.py --base-url http://staging:3000 --max-concurrent 10,20,40
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shlex
+import string
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import aiohttp
+from metrics import LatencyTracker
+
+PARAMETERS = {
+    "max_concurrent": "MAX_CONCURRENT",
+    "initial_page_pool_size": "INITIAL_PAGE_POOL_SIZE",
+    "max_page_usage": "MAX_PAGE_USAGE",
+    "max_requests_before_restart": "MAX_REQUESTS_BEFORE_RESTART",
+}
+
+
+def _parse_values(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def get_host_info() -> Dict:
+    """本机 CPU 与内存信息"""
+    total_memory = None
+    try:
+        import psutil
+
+        total_memory = psutil.virtual_memory().total
+    except ImportError:
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemTotal:"):
+                        total_memory = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+
+    return {"cpu_count": os.cpu_count(), "total_memory_mb": total_memory and total_memory / 2**20}
+
+
+def get_process_tree_rss_mb(pid: int) -> Optional[float]:
+    """服务进程及其子进程（浏览器）的常驻内存，需要 psutil"""
+    try:
+        import psutil
+
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes if p.is_running()) / 2**20
+    except Exception:
+        return None
+
+
+class QuadraticSurface:
+    """二次响应曲面：y = b0 + Σ bi·xi + Σ ci·xi²（各参数先归一化到 [0, 1]）"""
+
+    def __init__(self, names: List[str], ridge: float = 1e-3):
+        self.names = names
+        self.ridge = ridge
+        self.bounds: Dict[str, tuple] = {}
+        self.coefficients: Optional[List[float]] = None
+
+    def _features(self, config: Dict) -> List[float]:
+        features = [1.0]
+        for name in self.names:
+            low, high = self.bounds[name]
+            x = (config[name] - low) / (high - low) if high > low else 0.0
+            features += [x, x * x]
+        return features
+
+    def fit(self, configs: List[Dict], values: List[float]) -> bool:
+        """最小二乘拟合，样本不足时返回 False"""
+        self.bounds = {
+            name: (min(c[name] for c in configs), max(c[name] for c in configs))
+            for name in self.names
+        }
+        rows = [self._features(c) for c in configs]
+        size = len(rows[0])
+        if len(rows) < size:
+            return False
+
+        # 正规方程 (XᵀX + λI)b = Xᵀy，高斯消元求解
+        matrix = [
+            [sum(r[i] * r[j] for r in rows) + (self.ridge if i == j else 0.0) for j in range(size)]
+            + [sum(r[i] * y for r, y in zip(rows, values))]
+            for i in range(size)
+        ]
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+            matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+            if abs(matrix[col][col]) < 1e-12:
+                return False
+            for row in range(size):
+                if row != col:
+                    factor = matrix[row][col] / matrix[col][col]
+                    matrix[row] = [a - factor * b for a, b in zip(matrix[row], matrix[col])]
+        self.coefficients = [matrix[i][size] / matrix[i][i] for i in range(size)]
+        return True
+
+    def predict(self, config: Dict) -> float:
+        return sum(c * f for c, f in zip(self.coefficients, self._features(config)))
+
+
+class LoadRunner:
+    """闭环压测：固定客户端并发，统计吞吐、p99 和错误率"""
+
+    def __init__(self, base_url: str, concurrency: int, total_requests: int, timeout_ms: int):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.timeout_ms = timeout_ms
+
+    async def run(self) -> Dict:
+        latency = LatencyTracker(window_size=self.total_requests)
+        counters = {"success": 0, "error": 0}
+        remaining = iter(range(self.total_requests))
+
+        async def worker(session: aiohttp.ClientSession):
+            for _ in remaining:
+                word = "".join(random.choices(string.ascii_lowercase, k=8))
+                start = time.time()
+                try:
+                    async with session.post(
+                        f"{self.base_url}/scrape",
+                        json={"word": word, "timeout": self.timeout_ms},
+                    ) as response:
+                        await response.read()
+                        ok = response.status == 200
+                except Exception:
+                    ok = False
+                if ok:
+                    counters["success"] += 1
+                    latency.record((time.time() - start) * 1000)
+                else:
+                    counters["error"] += 1
+
+        start = time.time()
+        timeout = aiohttp.ClientTimeout(total=self.timeout_ms / 1000 * 3)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            await asyncio.gather(*[worker(session) for _ in range(self.concurrency)])
+        elapsed = time.time() - start
+
+        total = counters["success"] + counters["error"]
+        return {
+            "throughput": counters["success"] / elapsed if elapsed > 0 else 0,
+            "p99": latency.percentile(99) or 0,
+            "error_rate": counters["error"] / total if total else 1.0,
+            "duration": elapsed,
+        }
+
+
+class CapacityPlanner:
+    def __init__(self, args):
+        self.args = args
+        self.results: List[Dict] = []
+
+    def _grid(self) -> List[Dict]:
+        args = self.args
+        values = {
+            "max_concurrent": args.max_concurrent,
+            "initial_page_pool_size": args.pool_size,
+            "max_page_usage": args.max_page_usage,
+            "max_requests_before_restart": args.max_requests,
+        }
+        if args.base_url:
+            # 远程服务无法重启，只扫描运行时可调的并发数
+            values = {"max_concurrent": args.max_concurrent}
+        names = list(values)
+        return [dict(zip(names, combo)) for combo in itertools.product(*values.values())]
+
+    async def _wait_ready(self, base_url: str, timeout: float = 120) -> bool:
+        deadline = time.time() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.time() < deadline:
+                try:
+                    async with session.get(f"{base_url}/health") as response:
+                        if response.status == 200:
+                            return True
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(1)
+        return False
+
+    async def _measure(self, config: Dict) -> Optional[Dict]:
+        args = self.args
+        process = None
+        base_url = args.base_url
+
+        if base_url:
+            async with aiohttp.ClientSession() as session:
+                async with session.put(
+                    f"{base_url}/concurrency",
+                    json={"max_concurrent": config["max_concurrent"]},
+                ) as response:
+                    if response.status != 200:
+                        print(
+                            f"  target rejected max_concurrent={config['max_concurrent']} "
+                            f"(HTTP {response.status}): {await response.text()}"
+                        )
+                        return None
+                async with session.get(f"{base_url}/concurrency") as response:
+                    applied = (await response.json()).get("max_concurrent")
+                if applied != config["max_concurrent"]:
+                    print(f"  target reports max_concurrent={applied}, expected {config['max_concurrent']}")
+                    return None
+        else:
+            env = dict(os.environ, PORT=str(args.port))
+            env.update({PARAMETERS[name]: str(value) for name, value in config.items()})
+            command = [sys.executable, __file__, "--serve-stub"] if args.stub else shlex.split(args.server_cmd)
+            process = subprocess.Popen(
+                command,
+                env=env,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        try:
+            if not await self._wait_ready(base_url):
+                print(f"  target did not become ready for {config}")
+                return None
+
+            runner = LoadRunner(base_url, args.concurrency, args.warmup, args.timeout)
+            await runner.run()
+
+            runner.total_requests = args.requests
+            measurement = await runner.run()
+            measurement["memory_mb"] = get_process_tree_rss_mb(process.pid) if process else None
+            return measurement
+        finally:
+            if process:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    def _recommend(self, host: Dict) -> Dict:
+        """拟合曲面，在满足 SLO 的配置中选出吞吐最高者"""
+        args = self.args
+        measured = [r for r in self.results if r["measurement"]]
+        if not measured:
+            return {}
+
+        configs = [r["config"] for r in measured]
+        names = [n for n in configs[0] if len({c[n] for c in configs}) > 1]
+
+        memory_budget = (
+            host["total_memory_mb"] * args.memory_fraction if host["total_memory_mb"] else None
+        )
+
+        def feasible(m: Dict) -> bool:
+            if m["p99"] > args.slo_p99 or m["error_rate"] > args.max_error_rate:
+                return False
+            if memory_budget and m.get("memory_mb") and m["memory_mb"] > memory_budget:
+                return False
+            return True
+
+        best_measured = max(
+            (r for r in measured if feasible(r["measurement"])),
+            key=lambda r: r["measurement"]["throughput"],
+            default=None,
+        )
+
+        surfaces = {}
+        metrics = ["throughput", "p99", "error_rate"]
+        if all(r["measurement"].get("memory_mb") is not None for r in measured):
+            metrics.append("memory_mb")
+        for metric in metrics:
+            surface = QuadraticSurface(names)
+            if names and surface.fit(configs, [r["measurement"][metric] for r in measured]):
+                surfaces[metric] = surface
+
+        predicted = None
+        if len(surfaces) == len(metrics):
+            # 在测量范围内的整数网格上搜索（每个参数最多约 20 个取值）
+            axes = {}
+            for name in names:
+                low, high = min(c[name] for c in configs), max(c[name] for c in configs)
+                axes[name] = range(low, high + 1, max(1, (high - low) // 20))
+            fixed = {n: v for n, v in configs[0].items() if n not in names}
+            for combo in itertools.product(*axes.values()):
+                config = {**fixed, **dict(zip(names, combo))}
+                estimate = {m: surfaces[m].predict(config) for m in metrics}
+                if not feasible(estimate):
+                    continue
+                if predicted is None or estimate["throughput"] > predicted["estimate"]["throughput"]:
+                    predicted = {"config": config, "estimate": estimate}
+
+        return {
+            "host": host,
+            "slo_p99_ms": args.slo_p99,
+            "max_error_rate": args.max_error_rate,
+            "memory_budget_mb": memory_budget,
+            "best_measured": best_measured,
+            "predicted": predicted,
+        }
+
+    async def run(self) -> Dict:
+        host = get_host_info()
+        grid = self._grid()
+        print(f"🖥️  Host: {host}")
+        print(f"📐 Sweeping {len(grid)} configurations")
+
+        for index, config in enumerate(grid):
+            print(f"\n[{index + 1}/{len(grid)}] {config}")
+            measurement = await self._measure(config)
+            self.results.append({"config": config, "measurement": measurement})
+            if measurement:
+                print(
+                    f"  throughput {measurement['throughput']:.2f}/s, "
+                    f"p99 {measurement['p99']:.0f}ms, "
+                    f"errors {measurement['error_rate'] * 100:.1f}%, "
+                    f"memory {measurement['memory_mb'] or 0:.0f}MB"
+                )
+
+        recommendation = self._recommend(host)
+        report = {"results": self.results, "recommendation": recommendation}
+        with open(self.args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        print("\n" + "=" * 60)
+        print("📊 Recommendation")
+        print("=" * 60)
+        choice = recommendation.get("predicted") or recommendation.get("best_measured")
+        if not choice:
+            print("No configuration met the SLO")
+        else:
+            for name, value in choice["config"].items():
+                print(f"export {PARAMETERS[name]}={value}")
+        print(f"\nFull report written to {self.args.output}")
+        return report
+
+
+def serve_stub():
+    """模拟服务：页面池 + 每页内存 + 随并发增长的 CPU 争用延迟，用于验证规划流程"""
+    from aiohttp import web
+
+    pool_size = int(os.getenv("INITIAL_PAGE_POOL_SIZE", 5))
+    max_concurrent = int(os.getenv("MAX_CONCURRENT", 35))
+    max_page_usage = int(os.getenv("MAX_PAGE_USAGE", 20))
+    cpu_count = os.cpu_count() or 1
+
+    pages = asyncio.Semaphore(pool_size)
+    slots = asyncio.Semaphore(max_concurrent)
+    state = {"active": 0, "uses": 0}
+    ballast = [bytearray(30 * 2**20) for _ in range(pool_size)]  # 每个页面约 30MB
+
+    async def health(request):
+        return web.json_response({"status": "OK", "pages": len(ballast)})
+
+    async def scrape(request):
+        async with slots, pages:
+            state["active"] += 1
+            state["uses"] += 1
+            try:
+                contention = max(1.0, state["active"] / cpu_count)
+                delay = random.uniform(0.3, 0.6) * contention
+                if state["uses"] % max_page_usage == 0:
+                    delay += 0.5  # 页面回收
+                await asyncio.sleep(delay)
+            finally:
+                state["active"] -= 1
+        return web.json_response({"success": True})
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_post("/scrape", scrape)
+    web.run_app(app, host="127.0.0.1", port=int(os.getenv("PORT", 3000)), print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper capacity planner")
+    parser.add_argument("--max-concurrent", type=_parse_values, default=[10, 20, 35])
+    parser.add_argument("--pool-size", type=_parse_values, default=[3, 5, 8])
+    parser.add_argument("--max-page-usage", type=_parse_values, default=[20])
+    parser.add_argument("--max-requests", type=_parse_values, default=[500])
+    parser.add_argument("--concurrency", type=int, default=20, help="load client concurrency")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per configuration")
+    parser.add_argument("--warmup", type=int, default=10, help="warm-up requests per configuration")
+    parser.add_argument("--timeout", type=int, default=30000, help="scrape timeout in ms")
+    parser.add_argument("--slo-p99", type=float, default=5000, help="p99 latency SLO in ms")
+    parser.add_argument("--max-error-rate", type=float, default=0.05)
+    parser.add_argument("--memory-fraction", type=float, default=0.7, help="share of host memory usable")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--server-cmd", default=f"{sys.executable} server.py")
+    parser.add_argument("--base-url", help="existing (e.g. staging) server; only max_concurrent is swept")
+    parser.add_argument("--stub", action="store_true", help="sweep against a simulated server")
+    parser.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", default="capacity-plan.json")
+    args = parser.parse_args()
+
+    if args.serve_stub:
+        serve_stub()
+        return
+
+    asyncio.run(CapacityPlanner(args).run())
+
+
+if __name__ == "__main__":
+    main()
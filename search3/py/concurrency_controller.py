@@ -1,6 +1,11 @@
 import asyncio
+import contextvars
 from typing import Callable, Any, Dict, Set, List
 import logging
+from log_pipeline import category_logger
+
+# 每个任务完成都会输出，由日志管道采样
+CONCURRENCY_LOG = category_logger(__name__, "concurrency")
 
 class ConcurrencyController:
     def __init__(self, max_concurrent: int = 3):
@@ -13,7 +18,28 @@ class ConcurrencyController:
 
     async def execute(self, fn: Callable, *args, **kwargs) -> Any:
         """执行函数，遵守并发限制"""
-        return await asyncio.get_event_loop().create_future()
+        future = asyncio.get_event_loop().create_future()
+        self.pending_queue.append({
+            'fn': fn,
+            'args': args,
+            'kwargs': kwargs,
+            'future': future,
+            # 保留调用方上下文（如追踪 ID），任务可能由其他请求的完成回调启动
+            'context': contextvars.copy_context(),
+            'task': None
+        })
+        task_info = self.pending_queue[-1]
+        try:
+            await self._process_queue()
+            return await future
+        except asyncio.CancelledError:
+            # 调用方已取消：仍在排队则移出队列，已在执行则一并取消
+            future.cancel()
+            if task_info in self.pending_queue:
+                self.pending_queue.remove(task_info)
+            elif task_info['task'] is not None:
+                task_info['task'].cancel()
+            raise
 
     async def _process_queue(self):
         """处理等待队列"""
@@ -24,9 +50,14 @@ class ConcurrencyController:
             while (self.running < self.max_concurrent and 
                    self.pending_queue):
                 task_info = self.pending_queue.pop(0)
+                if task_info['future'].done():
+                    # 调用方已取消
+                    continue
                 self.running += 1
                 
-                task = asyncio.create_task(self._run_task(task_info))
+                # 在调用方的上下文中创建任务（保留追踪 ID）；create_task 的 context 参数需要 3.11
+                task = task_info['context'].run(asyncio.create_task, self._run_task(task_info))
+                task_info['task'] = task
                 self.active_tasks.add(task)
                 task.add_done_callback(self._task_completed)
 
@@ -39,11 +70,12 @@ class ConcurrencyController:
             future = task_info['future']
             
             result = await fn(*args, **kwargs)
-            future.set_result(result)
+            if not future.done():
+                future.set_result(result)
             return result
         except Exception as e:
-            task_info['future'].set_exception(e)
-            raise
+            if not task_info['future'].done():
+                task_info['future'].set_exception(e)
 
     def _task_completed(self, task: asyncio.Task):
         """任务完成回调"""
@@ -54,9 +86,9 @@ class ConcurrencyController:
 
     def _update_stats(self):
         """更新统计信息"""
-        self._logger.info(
-            f"Concurrency: {self.running}/{self.max_concurrent}, "
-            f"Queued: {len(self.pending_queue)}"
+        CONCURRENCY_LOG.info(
+            "Concurrency: %d/%d, Queued: %d",
+            self.running, self.max_concurrent, len(self.pending_queue),
         )
 
     def get_stats(self) -> Dict[str, Any]:
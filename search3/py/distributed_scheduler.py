@@ -0,0 +1,633 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from log_pipeline import new_trace_id
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _dead_letter_result(payload: str, attempts: int) -> str:
+    try:
+        word = json.loads(payload).get("word")
+    except (ValueError, AttributeError):
+        word = None
+    return json.dumps({
+        "success": False,
+        "word": word,
+        "error": f"Lease expired after {attempts} attempts, task moved to dead letter",
+        "attempts": attempts,
+    })
+
+
+class MemoryQueueBackend:
+    """进程内队列后端，与 RedisQueueBackend 语义一致，用于单机调试和测试"""
+
+    def __init__(self):
+        self.queue: Dict[str, float] = {}  # task_id -> score
+        self.leases: Dict[str, float] = {}  # task_id -> 租约到期时间
+        self.owners: Dict[str, str] = {}
+        self.attempts: Dict[str, int] = {}
+        self.tasks: Dict[str, str] = {}
+        self.nodes: Dict[str, str] = {}
+        self.results: Dict[str, Tuple[str, float]] = {}
+        self.dead: Dict[str, str] = {}
+
+    async def enqueue(self, task_id: str, payload: str, score: float):
+        self.tasks[task_id] = payload
+        self.queue[task_id] = score
+
+    async def claim(self, node_id: str, now_ms: int, lease_ms: int, limit: int) -> List[Tuple[str, str, int]]:
+        ready = sorted(
+            (score, task_id) for task_id, score in self.queue.items() if score <= now_ms
+        )[:limit]
+
+        claimed = []
+        for _, task_id in ready:
+            del self.queue[task_id]
+            self.leases[task_id] = now_ms + lease_ms
+            self.owners[task_id] = node_id
+            self.attempts[task_id] = self.attempts.get(task_id, 0) + 1
+            claimed.append((task_id, self.tasks.get(task_id, ""), self.attempts[task_id]))
+        return claimed
+
+    async def ack(self, task_id: str, node_id: str) -> bool:
+        if self.owners.get(task_id) != node_id:
+            return False
+        self.leases.pop(task_id, None)
+        self.owners.pop(task_id, None)
+        self.attempts.pop(task_id, None)
+        self.tasks.pop(task_id, None)
+        return True
+
+    async def release(self, task_id: str, node_id: str, score: float) -> bool:
+        if self.owners.get(task_id) != node_id:
+            return False
+        self.leases.pop(task_id, None)
+        self.owners.pop(task_id, None)
+        self.queue[task_id] = score
+        return True
+
+    async def renew(self, task_ids: List[str], node_id: str, expiry_ms: int) -> int:
+        renewed = 0
+        for task_id in task_ids:
+            if self.owners.get(task_id) == node_id and task_id in self.leases:
+                self.leases[task_id] = expiry_ms
+                renewed += 1
+        return renewed
+
+    async def requeue_expired(self, now_ms: int, max_attempts: int, result_ttl: int) -> Tuple[int, int]:
+        expired = [task_id for task_id, expiry in self.leases.items() if expiry <= now_ms]
+        dead = 0
+        for task_id in expired:
+            del self.leases[task_id]
+            self.owners.pop(task_id, None)
+            attempts = self.attempts.get(task_id, 0)
+            if attempts >= max_attempts:
+                # 多次租约过期（如任务反复拖垮节点），移入死信
+                dead += 1
+                payload = self.tasks.pop(task_id, "")
+                self.attempts.pop(task_id, None)
+                self.dead[task_id] = payload
+                await self.set_result(task_id, _dead_letter_result(payload, attempts), result_ttl)
+            else:
+                self.queue[task_id] = now_ms
+        return len(expired) - dead, dead
+
+    async def pending_count(self) -> int:
+        return len(self.queue)
+
+    async def heartbeat(self, node_id: str, info: str):
+        self.nodes[node_id] = info
+
+    async def remove_node(self, node_id: str):
+        self.nodes.pop(node_id, None)
+
+    async def get_nodes(self) -> Dict[str, str]:
+        return dict(self.nodes)
+
+    async def set_result(self, task_id: str, result: str, ttl_seconds: int) -> bool:
+        self._expire_results()
+        if task_id in self.results:
+            return False
+        self.results[task_id] = (result, time.time() + ttl_seconds)
+        return True
+
+    async def get_result(self, task_id: str) -> Optional[str]:
+        self._expire_results()
+        entry = self.results.get(task_id)
+        return entry[0] if entry else None
+
+    def _expire_results(self):
+        now = time.time()
+        for task_id in [t for t, (_, expiry) in self.results.items() if expiry <= now]:
+            del self.results[task_id]
+
+    async def close(self):
+        pass
+
+
+class RedisQueueBackend:
+    """基于 Redis 有序集合的队列后端，所有状态变更通过 Lua 脚本保证原子性
+
+    键结构（prefix 默认 scraper）：
+      {prefix}:queue     ZSET  待执行任务，score 为可执行时间（毫秒，优先级会提前该时间）
+      {prefix}:leases    ZSET  已领取任务，score 为租约到期时间
+      {prefix}:owners    HASH  任务 -> 领取节点
+      {prefix}:attempts  HASH  任务 -> 领取次数
+      {prefix}:tasks     HASH  任务 -> 任务内容
+      {prefix}:nodes     HASH  节点 -> 心跳与容量信息
+      {prefix}:dead      HASH  死信任务 -> 任务内容（租约过期次数达到上限）
+      {prefix}:result:*  STRING 任务结果（带过期时间）
+    """
+
+    CLAIM_SCRIPT = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+    local out = {}
+    for _, id in ipairs(ids) do
+      redis.call('ZREM', KEYS[1], id)
+      redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[2]), id)
+      redis.call('HSET', KEYS[3], id, ARGV[4])
+      local attempts = redis.call('HINCRBY', KEYS[4], id, 1)
+      local payload = redis.call('HGET', KEYS[5], id)
+      table.insert(out, id)
+      table.insert(out, payload or '')
+      table.insert(out, attempts)
+    end
+    return out
+    """
+
+    ACK_SCRIPT = """
+    if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+      return 0
+    end
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    return 1
+    """
+
+    RELEASE_SCRIPT = """
+    if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+      return 0
+    end
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('ZADD', KEYS[3], tonumber(ARGV[3]), ARGV[1])
+    return 1
+    """
+
+    REQUEUE_SCRIPT = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    local requeued, dead = 0, 0
+    for _, id in ipairs(ids) do
+      redis.call('ZREM', KEYS[1], id)
+      redis.call('HDEL', KEYS[2], id)
+      local attempts = tonumber(redis.call('HGET', KEYS[4], id) or '0')
+      if attempts >= tonumber(ARGV[2]) then
+        local payload = redis.call('HGET', KEYS[5], id) or ''
+        local ok, task = pcall(cjson.decode, payload)
+        local word = (ok and type(task) == 'table') and task['word'] or cjson.null
+        redis.call('HSET', KEYS[6], id, payload)
+        redis.call('HDEL', KEYS[4], id)
+        redis.call('HDEL', KEYS[5], id)
+        redis.call('SET', ARGV[4] .. id, cjson.encode({
+          success = false,
+          word = word,
+          error = 'Lease expired after ' .. attempts .. ' attempts, task moved to dead letter',
+          attempts = attempts
+        }), 'EX', tonumber(ARGV[3]), 'NX')
+        dead = dead + 1
+      else
+        redis.call('ZADD', KEYS[3], tonumber(ARGV[1]), id)
+        requeued = requeued + 1
+      end
+    end
+    return {requeued, dead}
+    """
+
+    RENEW_SCRIPT = """
+    local renewed = 0
+    for i = 3, #ARGV do
+      if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1]
+         and redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+        redis.call('ZADD', KEYS[1], tonumber(ARGV[2]), ARGV[i])
+        renewed = renewed + 1
+      end
+    end
+    return renewed
+    """
+
+    def __init__(self, url: str = None, prefix: str = "scraper"):
+        # redis 为可选依赖，仅在使用 Redis 后端时需要
+        import redis.asyncio as aioredis
+
+        self.client = aioredis.from_url(
+            url or os.getenv("REDIS_URL", "redis://127.0.0.1:6379"),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            decode_responses=True,
+        )
+        self.keys = {
+            name: f"{prefix}:{name}"
+            for name in ("queue", "leases", "owners", "attempts", "tasks", "nodes", "dead")
+        }
+        self.result_prefix = f"{prefix}:result:"
+
+        self._claim = self.client.register_script(self.CLAIM_SCRIPT)
+        self._ack = self.client.register_script(self.ACK_SCRIPT)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+        self._requeue = self.client.register_script(self.REQUEUE_SCRIPT)
+        self._renew = self.client.register_script(self.RENEW_SCRIPT)
+
+    async def enqueue(self, task_id: str, payload: str, score: float):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.keys["tasks"], task_id, payload)
+            pipe.zadd(self.keys["queue"], {task_id: score})
+            await pipe.execute()
+
+    async def claim(self, node_id: str, now_ms: int, lease_ms: int, limit: int) -> List[Tuple[str, str, int]]:
+        k = self.keys
+        flat = await self._claim(
+            keys=[k["queue"], k["leases"], k["owners"], k["attempts"], k["tasks"]],
+            args=[now_ms, lease_ms, limit, node_id],
+        )
+        return [
+            (flat[i], flat[i + 1], int(flat[i + 2])) for i in range(0, len(flat), 3)
+        ]
+
+    async def ack(self, task_id: str, node_id: str) -> bool:
+        k = self.keys
+        result = await self._ack(
+            keys=[k["leases"], k["owners"], k["attempts"], k["tasks"]],
+            args=[task_id, node_id],
+        )
+        return bool(result)
+
+    async def release(self, task_id: str, node_id: str, score: float) -> bool:
+        k = self.keys
+        result = await self._release(
+            keys=[k["leases"], k["owners"], k["queue"]],
+            args=[task_id, node_id, score],
+        )
+        return bool(result)
+
+    async def renew(self, task_ids: List[str], node_id: str, expiry_ms: int) -> int:
+        if not task_ids:
+            return 0
+        k = self.keys
+        return int(
+            await self._renew(keys=[k["leases"], k["owners"]], args=[node_id, expiry_ms, *task_ids])
+        )
+
+    async def requeue_expired(self, now_ms: int, max_attempts: int, result_ttl: int) -> Tuple[int, int]:
+        k = self.keys
+        requeued, dead = await self._requeue(
+            keys=[k["leases"], k["owners"], k["queue"], k["attempts"], k["tasks"], k["dead"]],
+            args=[now_ms, max_attempts, result_ttl, self.result_prefix],
+        )
+        return int(requeued), int(dead)
+
+    async def pending_count(self) -> int:
+        return await self.client.zcard(self.keys["queue"])
+
+    async def heartbeat(self, node_id: str, info: str):
+        await self.client.hset(self.keys["nodes"], node_id, info)
+
+    async def remove_node(self, node_id: str):
+        await self.client.hdel(self.keys["nodes"], node_id)
+
+    async def get_nodes(self) -> Dict[str, str]:
+        return await self.client.hgetall(self.keys["nodes"])
+
+    async def set_result(self, task_id: str, result: str, ttl_seconds: int) -> bool:
+        # NX：同一任务重复执行时以首个结果为准
+        return bool(
+            await self.client.set(
+                self.result_prefix + task_id, result, ex=ttl_seconds, nx=True
+            )
+        )
+
+    async def get_result(self, task_id: str) -> Optional[str]:
+        return await self.client.get(self.result_prefix + task_id)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class DistributedScheduler:
+    """多节点任务调度：共享延时/优先级队列 + 租约 + 节点心跳
+
+    每个节点按本地空闲容量和集群中的容量占比拉取任务；节点宕机后其租约
+    到期，任务由其他节点重新领取。
+    """
+
+    def __init__(self, scraper, backend, options: Dict = None):
+        options = options or {}
+
+        self.scraper = scraper
+        self.backend = backend
+        # 实际执行抓取的函数，默认直接使用浏览器页面
+        self.fetch = options.get("fetch", scraper.scrape_page)
+        self.node_id = options.get(
+            "node_id",
+            os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}",
+        )
+        self.max_in_flight = options.get(
+            "max_in_flight",
+            int(os.getenv("NODE_MAX_IN_FLIGHT", scraper.initial_page_pool_size)),
+        )
+        self.lease_ms = options.get("lease_ms", int(os.getenv("TASK_LEASE_MS", 60000)))
+        self.max_attempts = options.get("max_attempts", int(os.getenv("TASK_MAX_ATTEMPTS", 3)))
+        self.result_ttl = options.get("result_ttl", int(os.getenv("TASK_RESULT_TTL", 3600)))
+        self.heartbeat_interval = options.get("heartbeat_interval", 2.0)
+        self.node_ttl = options.get("node_ttl", 10.0)
+        self.poll_interval = options.get("poll_interval", 0.2)
+        # 每级优先级将任务提前的毫秒数
+        self.priority_step_ms = options.get("priority_step_ms", 1000)
+
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._loops: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._running = False
+        self._wakeup = asyncio.Event()
+
+        self.stats = {
+            "claimed": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "requeued_expired": 0,
+            "dead_lettered": 0,
+            "leases_renewed": 0,
+            "duplicate_results": 0,
+        }
+
+        self._logger = logging.getLogger(__name__)
+
+    async def start(self):
+        """启动心跳、租约回收和拉取循环"""
+        if self._running:
+            return
+        self._running = True
+        await self._heartbeat()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        self._loops = [
+            asyncio.create_task(self._reaper_loop()),
+            asyncio.create_task(self._pull_loop()),
+        ]
+        self._logger.info(
+            f"Distributed scheduler started (node: {self.node_id}, "
+            f"max_in_flight: {self.max_in_flight})"
+        )
+
+    async def stop(self):
+        """停止拉取，等待在途任务完成后注销节点
+
+        等待期间心跳循环继续续租，停机时完成的慢任务不会因租约过期被其他节点重复执行。
+        """
+        self._running = False
+        self._wakeup.set()
+        for loop in self._loops:
+            loop.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops.clear()
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+        await self.backend.remove_node(self.node_id)
+        self._logger.info(f"Distributed scheduler stopped (node: {self.node_id})")
+
+    async def submit(self, word: str, options: Dict = None, priority: int = 0, delay_ms: int = 0) -> str:
+        """提交任务，返回任务 ID"""
+        task_id = uuid.uuid4().hex
+        payload = json.dumps({"word": word, "options": options or {}})
+        score = _now_ms() + delay_ms - priority * self.priority_step_ms
+        await self.backend.enqueue(task_id, payload, score)
+        self._wakeup.set()
+        return task_id
+
+    async def get_result(self, task_id: str) -> Optional[Dict]:
+        """获取任务结果，未完成时返回 None"""
+        result = await self.backend.get_result(task_id)
+        return json.loads(result) if result else None
+
+    async def _heartbeat(self):
+        """上报节点容量"""
+        free = self.max_in_flight - len(self._in_flight)
+        info = {
+            "capacity": self.max_in_flight,
+            "in_flight": len(self._in_flight),
+            "free": free,
+            "heartbeat_at": time.time(),
+        }
+        await self.backend.heartbeat(self.node_id, json.dumps(info))
+
+    async def _renew_leases(self):
+        """续租在途任务，执行时间超过租约的慢任务不会被其他节点重复领取"""
+        task_ids = list(self._in_flight)
+        if task_ids:
+            self.stats["leases_renewed"] += await self.backend.renew(
+                task_ids, self.node_id, _now_ms() + self.lease_ms
+            )
+
+    async def _heartbeat_loop(self):
+        # 停止后仍为在途任务续租，直到全部完成
+        while self._running or self._in_flight:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+                await self._renew_leases()
+            except Exception as e:
+                self._logger.error(f"Heartbeat failed: {e}")
+
+    async def _reaper_loop(self):
+        """回收租约过期的任务（节点宕机或超时）"""
+        while self._running:
+            await asyncio.sleep(self.lease_ms / 4000)
+            try:
+                requeued, dead = await self.backend.requeue_expired(
+                    _now_ms(), self.max_attempts, self.result_ttl
+                )
+                if requeued:
+                    self.stats["requeued_expired"] += requeued
+                    self._logger.warning(f"Requeued {requeued} tasks with expired leases")
+                if dead:
+                    self.stats["dead_lettered"] += dead
+                    self._logger.error(
+                        f"Moved {dead} tasks to dead letter after {self.max_attempts} expired leases"
+                    )
+            except Exception as e:
+                self._logger.error(f"Lease reaper failed: {e}")
+
+    async def get_alive_nodes(self) -> Dict[str, Dict]:
+        """获取心跳未过期的节点"""
+        now = time.time()
+        nodes = {}
+        for node_id, info in (await self.backend.get_nodes()).items():
+            info = json.loads(info)
+            if now - info.get("heartbeat_at", 0) <= self.node_ttl:
+                nodes[node_id] = info
+        return nodes
+
+    async def _claim_limit(self) -> int:
+        """按本地空闲容量和集群容量占比计算本轮拉取数量"""
+        free = self.max_in_flight - len(self._in_flight)
+        if free <= 0:
+            return 0
+
+        pending = await self.backend.pending_count()
+        if pending == 0:
+            return 0
+
+        nodes = await self.get_alive_nodes()
+        cluster_free = sum(n.get("free", 0) for n in nodes.values())
+        cluster_free = max(cluster_free, free)
+
+        # 待处理任务按空闲容量比例分配，避免单节点抢光队列
+        share = max(1, round(pending * free / cluster_free))
+        return min(free, share)
+
+    async def _pull_loop(self):
+        while self._running:
+            try:
+                limit = await self._claim_limit()
+                claimed = []
+                if limit > 0:
+                    claimed = await self.backend.claim(
+                        self.node_id, _now_ms(), self.lease_ms, limit
+                    )
+
+                for task_id, payload, attempts in claimed:
+                    self.stats["claimed"] += 1
+                    task = asyncio.create_task(self._run_task(task_id, payload, attempts))
+                    self._in_flight[task_id] = task
+                    task.add_done_callback(lambda _, t=task_id: self._on_task_done(t))
+
+                if not claimed:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Pull loop error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def _on_task_done(self, task_id: str):
+        self._in_flight.pop(task_id, None)
+        self._wakeup.set()
+
+    async def _run_task(self, task_id: str, payload: str, attempts: int):
+        """执行任务并写入共享结果"""
+        # 任务 ID 即追踪 ID，跨节点重试时保持一致
+        new_trace_id(task_id)
+        try:
+            task = json.loads(payload)
+        except ValueError:
+            self._logger.error(f"Dropping malformed task {task_id}")
+            await self.backend.ack(task_id, self.node_id)
+            return
+
+        try:
+            result = await self.fetch(task["word"], task.get("options"))
+        except Exception as e:
+            result = {"success": False, "word": task["word"], "error": str(e)}
+
+        if not result.get("success") and attempts < self.max_attempts:
+            # 退避后重新入队，由任意节点重试
+            self.stats["retried"] += 1
+            backoff = min(30000, 1000 * 2 ** (attempts - 1)) + random.randint(0, 500)
+            await self.backend.release(task_id, self.node_id, _now_ms() + backoff)
+            return
+
+        result["node_id"] = self.node_id
+        result["attempts"] = attempts
+        if not await self.backend.set_result(task_id, json.dumps(result), self.result_ttl):
+            self.stats["duplicate_results"] += 1
+        await self.backend.ack(task_id, self.node_id)
+
+        if result.get("success"):
+            self.stats["completed"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    async def get_status(self) -> Dict[str, Any]:
+        """获取节点与集群状态"""
+        return {
+            "node_id": self.node_id,
+            "in_flight": len(self._in_flight),
+            "max_in_flight": self.max_in_flight,
+            "pending": await self.backend.pending_count(),
+            "nodes": await self.get_alive_nodes(),
+            "stats": self.stats,
+        }
+
+
+if __name__ == "__main__":
+    # 多节点扩展性模拟：python distributed_scheduler.py [redis|memory] [任务数]
+    import sys
+
+    class _SimulatedScraper:
+        initial_page_pool_size = 5
+
+        async def scrape_page(self, word: str, options: Dict = None) -> Dict:
+            await asyncio.sleep(random.uniform(0.05, 0.15))
+            return {"success": True, "word": word}
+
+    async def _run(node_count: int, total: int, backend_name: str) -> float:
+        if backend_name == "redis":
+            backend = RedisQueueBackend(prefix=f"scraper-sim-{uuid.uuid4().hex[:8]}")
+        else:
+            backend = MemoryQueueBackend()
+
+        nodes = [
+            DistributedScheduler(_SimulatedScraper(), backend, {"node_id": f"node-{i}"})
+            for i in range(node_count)
+        ]
+        task_ids = [await nodes[0].submit(f"word-{i}") for i in range(total)]
+
+        start = time.time()
+        for node in nodes:
+            await node.start()
+        while True:
+            results = [await nodes[0].get_result(t) for t in task_ids]
+            if all(results):
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.time() - start
+
+        for node in nodes:
+            await node.stop()
+        await backend.close()
+
+        per_node = {n.node_id: n.stats["completed"] for n in nodes}
+        print(f"{node_count} nodes: {total / elapsed:.1f} tasks/s, per node: {per_node}")
+        return total / elapsed
+
+    async def _main():
+        backend_name = sys.argv[1] if len(sys.argv) > 1 else "memory"
+        total = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        baseline = None
+        for node_count in (1, 2, 4):
+            throughput = await _run(node_count, total, backend_name)
+            baseline = baseline or throughput
+            print(f"  speedup: {throughput / baseline:.2f}x")
+
+    asyncio.run(_main())
@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+
+
+class FailureType:
+    """抓取失败分类"""
+
+    TIMEOUT = "timeout"
+    PROXY = "proxy_failure"
+    CAPTCHA = "captcha"
+    CRASH = "renderer_crash"
+    EMPTY = "empty_results"
+    UNKNOWN = "unknown"
+
+
+# 每类失败的重试策略：
+#   max_retries - 最多重试次数（在截止时间内，换页面重试）
+#   quarantine  - 是否立即隔离出错的页面（关闭上下文，不再复用）
+#   backoff_ms  - 重试前等待时间
+RETRY_POLICIES: Dict[str, Dict] = {
+    FailureType.TIMEOUT: {"max_retries": 1, "quarantine": False, "backoff_ms": 0},
+    FailureType.PROXY: {"max_retries": 2, "quarantine": True, "backoff_ms": 0},
+    FailureType.CAPTCHA: {"max_retries": 2, "quarantine": True, "backoff_ms": 200},
+    FailureType.CRASH: {"max_retries": 2, "quarantine": True, "backoff_ms": 0},
+    FailureType.EMPTY: {"max_retries": 1, "quarantine": False, "backoff_ms": 100},
+    FailureType.UNKNOWN: {"max_retries": 0, "quarantine": False, "backoff_ms": 0},
+}
+
+# 被识别为机器流量 / 同意页拦截时 Google 返回的特征
+DETECTION_MARKERS = ("/sorry/", "unusual traffic", "g-recaptcha", "captcha-form")
+INTERSTITIAL_URL_MARKERS = ("/sorry/", "consent.google.", "/recaptcha/")
+
+# Chromium 网络错误码带 net:: 前缀；URL 中的冒号和空格会被编码，
+# 查询词不会误命中这些标记
+PROXY_ERROR_MARKERS = (
+    "net::ERR_PROXY",  # 含 ERR_PROXY_AUTH_*、ERR_PROXY_CONNECTION_FAILED
+    "net::ERR_TUNNEL_CONNECTION_FAILED",
+    "net::ERR_CONNECTION_REFUSED",
+    "net::ERR_CONNECTION_RESET",
+    "net::ERR_CONNECTION_CLOSED",
+    "net::ERR_EMPTY_RESPONSE",
+    "net::ERR_SOCKS_CONNECTION_FAILED",
+    "407 Proxy Authentication Required",
+)
+
+CRASH_MARKERS = (
+    "Target crashed",
+    "Page crashed",
+    "has been closed",
+    "Browser closed",
+    "Connection closed",
+)
+
+
+def classify_page(url: str, content: str = "") -> Optional[str]:
+    """根据页面地址和内容识别验证码 / 同意页，未识别返回 None"""
+    if any(marker in url for marker in INTERSTITIAL_URL_MARKERS):
+        return FailureType.CAPTCHA
+    if content and any(marker in content for marker in DETECTION_MARKERS):
+        return FailureType.CAPTCHA
+    return None
+
+
+def _is_timeout(error: BaseException) -> bool:
+    """内置 / asyncio 超时，以及 Playwright 的 TimeoutError（不继承内置类型）"""
+    return isinstance(error, TimeoutError) or any(
+        cls.__name__ == "TimeoutError" for cls in type(error).__mro__
+    )
+
+
+def classify_exception(error: BaseException, url: str = "") -> str:
+    """根据异常类型、错误信息和当前页面地址判定失败类型
+
+    先看异常类型再匹配错误信息：Playwright 的错误信息包含导航地址，
+    只按信息匹配会被查询词干扰。
+    """
+    interstitial = classify_page(url)
+    if interstitial:
+        return interstitial
+
+    if _is_timeout(error):
+        return FailureType.TIMEOUT
+
+    message = str(error)
+    if any(marker in message for marker in CRASH_MARKERS):
+        return FailureType.CRASH
+    if any(marker in message for marker in PROXY_ERROR_MARKERS):
+        return FailureType.PROXY
+    return FailureType.UNKNOWN
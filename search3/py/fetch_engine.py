@@ -0,0 +1,244 @@
+import asyncio
+import os
+import random
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+from metrics import LatencyTracker
+from scraper import load_proxy_list
+from failures import DETECTION_MARKERS
+
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+class TierStats:
+    """单层抓取统计"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.failures: Dict[str, int] = {}
+        self.latency = LatencyTracker()
+
+    def record(self, hit: bool, latency_ms: float, reason: str = None):
+        self.attempts += 1
+        self.latency.record(latency_ms)
+        if hit:
+            self.hits += 1
+        elif reason:
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.attempts if self.attempts else None,
+            "failures": self.failures,
+            "latency": self.latency.get_stats(),
+        }
+
+
+class HttpFetchTier:
+    """轻量 HTTP 抓取层：按代理复用连接池，支持 HTTP/2 时启用"""
+
+    def __init__(self, options: Dict = None):
+        options = options or {}
+
+        # httpx 为可选依赖（pip install httpx[http2]），未安装时 TieredFetchEngine 关闭 HTTP 层
+        import httpx
+
+        self._httpx = httpx
+        try:
+            import h2  # noqa: F401
+
+            self.http2 = options.get("http2", True)
+        except ImportError:
+            self.http2 = False
+
+        self.max_connections = options.get(
+            "max_connections", int(os.getenv("HTTP_TIER_MAX_CONNECTIONS", 20))
+        )
+        self.min_content_length = options.get("min_content_length", 10000)
+        self.search_url = options.get("search_url", "https://www.google.com/search")
+        self.proxy_list: List[str] = options.get("proxy_list", load_proxy_list())
+
+        self._clients: Dict[Optional[str], "httpx.AsyncClient"] = {}
+        self._logger = logging.getLogger(__name__)
+
+    def _get_client(self, proxy: Optional[str]):
+        """获取代理对应的长连接客户端"""
+        client = self._clients.get(proxy)
+        if client is None:
+            client = self._httpx.AsyncClient(
+                proxy=proxy,
+                http2=self.http2,
+                follow_redirects=True,
+                verify=False,
+                limits=self._httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={
+                    "User-Agent": (
+                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                        "(KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36"
+                    ),
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-US,en;q=0.9",
+                },
+            )
+            self._clients[proxy] = client
+        return client
+
+    async def fetch(self, word: str, timeout_ms: int) -> Dict:
+        """抓取并校验结果，返回 {"valid", "reason", "url", "content", "title"}"""
+        proxy = random.choice(self.proxy_list) if self.proxy_list else None
+        client = self._get_client(proxy)
+
+        response = await client.get(
+            self.search_url,
+            params={"q": word, "hl": "en"},
+            timeout=timeout_ms / 1000,
+        )
+        content = response.text
+        final_url = str(response.url)
+
+        reason = None
+        if response.status_code != 200:
+            reason = f"status_{response.status_code}"
+        elif any(marker in final_url or marker in content for marker in DETECTION_MARKERS):
+            reason = "detected"
+        elif 'id="search"' not in content:
+            reason = "no_results"
+        elif len(content) <= self.min_content_length:
+            reason = "short_content"
+
+        match = TITLE_PATTERN.search(content)
+        return {
+            "valid": reason is None,
+            "reason": reason,
+            "url": final_url,
+            "content": content,
+            "title": match.group(1).strip() if match else "",
+        }
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+class TieredFetchEngine:
+    """分层抓取：先走 HTTP 层，失败或被识别时再升级到浏览器页面
+
+    HTTP 层连续失败达到阈值后暂停一段时间，避免每个请求都多付一次失败的延迟。
+    """
+
+    def __init__(self, scraper, options: Dict = None):
+        options = options or {}
+
+        self.scraper = scraper
+        self.http_enabled = options.get(
+            "http_enabled", os.getenv("HTTP_TIER_ENABLED", "true").lower() == "true"
+        )
+        self.http_timeout = options.get(
+            "http_timeout", int(os.getenv("HTTP_TIER_TIMEOUT", 5000))
+        )
+        self.max_consecutive_failures = options.get("max_consecutive_failures", 20)
+        self.cooldown_seconds = options.get("cooldown_seconds", 60)
+
+        self._logger = logging.getLogger(__name__)
+
+        self.http_tier: Optional[HttpFetchTier] = None
+        if self.http_enabled:
+            try:
+                self.http_tier = HttpFetchTier(options.get("http_options"))
+            except ImportError as e:
+                self._logger.warning(
+                    f"HTTP tier disabled, optional dependency missing ({e}); "
+                    "install it with: pip install httpx[http2]"
+                )
+
+        self.stats = {"http": TierStats(), "browser": TierStats()}
+        self._consecutive_http_failures = 0
+        self._http_paused_until = 0.0
+
+    def _http_available(self) -> bool:
+        return self.http_tier is not None and time.time() >= self._http_paused_until
+
+    async def fetch(self, word: str, options: Dict = None) -> Dict:
+        """抓取关键词结果，返回结构与 WebScraper.scrape_page 一致"""
+        options = options or {}
+        start_time = time.time()
+
+        if self._http_available():
+            result = await self._fetch_http(word, options, start_time)
+            if result:
+                return result
+
+        browser_start = time.time()
+        result = await self.scraper.scrape_page(word, options)
+        self.stats["browser"].record(
+            result.get("success", False),
+            (time.time() - browser_start) * 1000,
+            None if result.get("success") else "failed",
+        )
+        result["tier"] = "browser"
+        return result
+
+    async def _fetch_http(self, word: str, options: Dict, start_time: float) -> Optional[Dict]:
+        """HTTP 层抓取，校验失败返回 None"""
+        # timeout 可为 None（请求未指定，浏览器层使用 Playwright 默认值）
+        timeout = min(options.get("timeout") or self.http_timeout, self.http_timeout)
+        try:
+            fetched = await self.http_tier.fetch(word, timeout)
+            reason = fetched["reason"]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            fetched = None
+            reason = type(e).__name__
+
+        latency = (time.time() - start_time) * 1000
+        self.stats["http"].record(reason is None, latency, reason)
+
+        if reason is not None:
+            self._consecutive_http_failures += 1
+            if self._consecutive_http_failures >= self.max_consecutive_failures:
+                self._http_paused_until = time.time() + self.cooldown_seconds
+                self._consecutive_http_failures = 0
+                self._logger.warning(
+                    f"HTTP tier paused for {self.cooldown_seconds}s after repeated failures"
+                )
+            return None
+
+        self._consecutive_http_failures = 0
+
+        result = {
+            "success": True,
+            "word": word,
+            "url": fetched["url"],
+            "title": fetched["title"],
+            "content": fetched["content"],
+            "response_time": int(latency),
+            "timestamp": datetime.now().isoformat(),
+            "tier": "http",
+        }
+        result.update(await self.scraper.process_content(word, fetched["content"]))
+        return result
+
+    def get_stats(self) -> Dict:
+        """各层命中率与延迟"""
+        total = sum(stats.hits for stats in self.stats.values())
+        return {
+            "http_enabled": self.http_tier is not None,
+            "http_paused": self.http_tier is not None and not self._http_available(),
+            "tiers": {name: stats.get_stats() for name, stats in self.stats.items()},
+            "served_by_http": self.stats["http"].hits / total if total else None,
+        }
+
+    async def close(self):
+        if self.http_tier:
+            await self.http_tier.close()
@@ -0,0 +1,186 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from playwright.async_api import Browser
+import logging
+from metrics import LatencyTracker
+
+
+class HealthSupervisor:
+    """页面与浏览器健康巡检
+
+    - 定期对空闲页面执行轻量 evaluate 探测，异常页面立即隔离并补充
+    - 监听页面 crash 和浏览器 disconnected 事件，立即移除/重建受影响的页面，
+      本地浏览器断开时直接重启
+    - 记录每次故障从发现到恢复的时间（MTTR）
+    """
+
+    def __init__(self, scraper, options: Dict = None):
+        options = options or {}
+
+        self.scraper = scraper
+        self.probe_interval = options.get(
+            "probe_interval", float(os.getenv("HEALTH_PROBE_INTERVAL", 10))
+        )
+        self.probe_timeout = options.get(
+            "probe_timeout", float(os.getenv("HEALTH_PROBE_TIMEOUT", 2))
+        )
+        # 空闲超过该时间的页面才探测，刚用过的页面视为健康
+        self.probe_idle_seconds = options.get("probe_idle_seconds", 5)
+
+        self.stats = {
+            "probes": 0,
+            "probe_failures": 0,
+            "page_crashes": 0,
+            "browser_disconnects": 0,
+            "browser_restarts": 0,
+            "recoveries": 0,
+        }
+        self.mttr = LatencyTracker()
+        # 未恢复的故障：页面故障在补充页面后恢复，浏览器故障在浏览器重新可用后恢复
+        self._page_incidents: List[float] = []
+        self._browser_incidents: List[float] = []
+
+        self._task: Optional[asyncio.Task] = None
+        self._heal_task: Optional[asyncio.Task] = None
+        self._running = False
+
+        self._logger = logging.getLogger(__name__)
+
+        scraper.on_page_added = self.watch_page
+        scraper.on_browser_ready = self.watch_browser
+
+    def watch_page(self, page_obj: Dict):
+        """监听页面崩溃"""
+        page_obj["page"].on("crash", lambda _: self._handle_page_crash(page_obj))
+
+    def watch_browser(self, browser: Browser):
+        """监听浏览器断开，并结束未恢复的浏览器故障"""
+        browser.on("disconnected", lambda _: self._handle_browser_disconnected(browser))
+        self._resolve(self._browser_incidents)
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._probe_loop())
+        self._logger.info(
+            f"Health supervisor started (probe every {self.probe_interval}s)"
+        )
+
+    async def stop(self):
+        self._running = False
+        for task in (self._task, self._heal_task):
+            if task and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._logger.info("Health supervisor stopped")
+
+    def _resolve(self, incidents: List[float]):
+        """记录故障恢复时间"""
+        now = datetime.now().timestamp()
+        for detected_at in incidents:
+            self.mttr.record((now - detected_at) * 1000)
+            self.stats["recoveries"] += 1
+        incidents.clear()
+
+    def _handle_page_crash(self, page_obj: Dict):
+        """页面崩溃：空闲页面立即隔离，使用中的页面标记降级，释放时退休"""
+        if not self._running:
+            return
+
+        self.stats["page_crashes"] += 1
+        self._page_incidents.append(datetime.now().timestamp())
+        self._logger.warning(f"Page {page_obj['id']} crashed")
+
+        page_obj["degraded"] = True
+        if self.scraper.page_status.get(page_obj["page"]) != "in-use":
+            self.scraper.quarantine_page(page_obj, "renderer_crash")
+        self._schedule_heal()
+
+    def _handle_browser_disconnected(self, browser: Browser):
+        """浏览器断开：本地浏览器立即重启，远程浏览器由连接池负责重连"""
+        if not self._running or self.scraper.browser_restart_in_progress:
+            return
+
+        self.stats["browser_disconnects"] += 1
+        self._browser_incidents.append(datetime.now().timestamp())
+        self._logger.warning("Browser disconnected")
+
+        if self.scraper.browser_pool is None and browser is self.scraper.browser:
+            self.stats["browser_restarts"] += 1
+            asyncio.create_task(self.scraper.restart_browser())
+
+    def _schedule_heal(self):
+        if self._heal_task is None or self._heal_task.done():
+            self._heal_task = asyncio.create_task(self._heal())
+
+    async def _heal(self):
+        """关闭隔离页面并将页面池补充到初始大小"""
+        if self.scraper.browser_restart_in_progress:
+            return
+        try:
+            await self.scraper.heal_pool()
+        except Exception as e:
+            self._logger.error(f"Page pool healing failed: {e}")
+            return
+
+        if len(self.scraper.page_pool) >= self.scraper.initial_page_pool_size:
+            self._resolve(self._page_incidents)
+
+    async def _probe_page(self, page_obj: Dict) -> bool:
+        """探测单个空闲页面，探测期间页面不会被分配"""
+        if not self.scraper.take_page_for_probe(page_obj):
+            return True
+        self.stats["probes"] += 1
+
+        try:
+            await asyncio.wait_for(page_obj["page"].evaluate("1"), self.probe_timeout)
+            healthy = True
+        except Exception as e:
+            healthy = False
+            self.stats["probe_failures"] += 1
+            self._logger.warning(f"Page {page_obj['id']} failed health probe: {e}")
+
+        # 探测期间页面可能已被移出池（如浏览器重启），此时不再记录事故
+        if self.scraper.return_probed_page(page_obj, healthy) and not healthy:
+            self._page_incidents.append(datetime.now().timestamp())
+        return healthy
+
+    async def _probe_loop(self):
+        while self._running:
+            await asyncio.sleep(self.probe_interval)
+            scraper = self.scraper
+            if scraper.browser_restart_in_progress or not scraper.is_initialized:
+                continue
+
+            try:
+                # 本地浏览器已断开但未触发事件
+                if scraper.browser_pool is None and scraper.browser and not scraper.browser.is_connected():
+                    self._handle_browser_disconnected(scraper.browser)
+                    continue
+
+                now = datetime.now()
+                idle = [
+                    page_obj
+                    for page_obj in scraper.page_pool
+                    if scraper.page_status.get(page_obj["page"]) == "available"
+                    and (now - page_obj["last_used"]).total_seconds() >= self.probe_idle_seconds
+                ]
+                results = await asyncio.gather(*[self._probe_page(p) for p in idle])
+
+                if not all(results) or len(scraper.page_pool) < scraper.initial_page_pool_size:
+                    self._schedule_heal()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Health probe loop error: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "open_incidents": len(self._page_incidents) + len(self._browser_incidents),
+            "mttr_ms": self.mttr.get_stats(),
+        }
@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+import logging
+from metrics import LatencyTracker
+
+
+class CountMinSketch:
+    """Count-Min 频率估计，固定内存，只会高估不会低估"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table: List[List[float]] = [[0.0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # 双重哈希：一次摘要得到 depth 个位置
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: float = 1.0) -> float:
+        """计数并返回新的估计值"""
+        estimate = None
+        for row, index in zip(self.table, self._indexes(key)):
+            row[index] += count
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+        return estimate
+
+    def estimate(self, key: str) -> float:
+        return min(row[index] for row, index in zip(self.table, self._indexes(key)))
+
+    def decay(self, factor: float):
+        for row in self.table:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value * factor
+
+
+class TopK:
+    """维护估计频率最高的 k 个关键词"""
+
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.scores: Dict[str, float] = {}
+
+    def offer(self, key: str, score: float):
+        if key in self.scores or len(self.scores) < self.k:
+            self.scores[key] = score
+            return
+        weakest = min(self.scores, key=self.scores.get)
+        if score > self.scores[weakest]:
+            del self.scores[weakest]
+            self.scores[key] = score
+
+    def decay(self, factor: float, min_score: float = 0.01):
+        self.scores = {
+            key: score * factor for key, score in self.scores.items() if score * factor >= min_score
+        }
+
+    def items(self) -> List:
+        return sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class ResultCache:
+    """抓取结果缓存（TTL + LRU）
+
+    natural_expires_at 记录没有预热时该结果本应过期的时间，
+    之后的命中都归功于预热，用于计算命中率提升。
+    条目保存完整页面内容，max_size 默认较小以限制内存。
+    """
+
+    def __init__(self, ttl: float = 60, max_size: int = 100):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "warmed_hits": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """返回缓存条目（含 result 与 cached_at），不存在或已过期返回 None"""
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry is None or entry["expires_at"] <= now:
+            self.stats["misses"] += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        if now > entry["natural_expires_at"]:
+            self.stats["warmed_hits"] += 1
+        return entry
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """剩余有效时间（秒），不存在或已过期返回 None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry["expires_at"] - time.time()
+        return remaining if remaining > 0 else None
+
+    def put(self, key: str, result: Dict, warmed: bool = False):
+        now = time.time()
+        expires_at = now + self.ttl
+        if warmed:
+            # 预热刷新不延长“本应过期”的时间；之前没有有效缓存则从现在起全部算作预热收益
+            previous = self.entries.get(key)
+            natural_expires_at = (
+                previous["natural_expires_at"]
+                if previous and previous["expires_at"] > now
+                else now
+            )
+        else:
+            natural_expires_at = expires_at
+
+        self.entries[key] = {
+            "result": result,
+            "cached_at": now,
+            "expires_at": expires_at,
+            "natural_expires_at": natural_expires_at,
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            # 没有预热就会变成未命中的请求占比
+            "hit_rate_gain": self.stats["warmed_hits"] / lookups if lookups else None,
+        }
+
+
+class KeywordWarmer:
+    """热门关键词预取与缓存预热
+
+    - 对经过服务入口的请求用 Count-Min + Top-K 统计频率，定期衰减以反映最近热度
+    - 页面池有空闲页面且无排队时，对即将过期或未缓存的热门关键词提前抓取
+    - 任何请求开始排队等待页面时立即取消进行中的预热抓取，把页面让给真实请求；
+      被取消的页面先导航回主页再交出（只等导航提交，通常远小于 5s 的复位超时）
+
+    默认关闭（KEYWORD_WARMING_ENABLED=true 开启）。开启后命中缓存的请求不会重新抓取、
+    保存和后处理，返回的是最多 TTL 秒之前的结果：response_time/timestamp 保持原抓取的值，
+    并附加 cache="hit"、cached_at 和 age_ms。请求选项 cache=False 可绕过缓存。
+    """
+
+    def __init__(self, scraper, fetch: Callable, options: Dict = None):
+        options = options or {}
+
+        self.scraper = scraper
+        # 真实请求路径（经过并发控制）
+        self.fetch_fn = fetch
+        # 预热抓取路径，直接使用页面池，不占用并发控制的名额
+        self.warm_fetch = options.get("warm_fetch", scraper.scrape_page)
+
+        self.enabled = options.get(
+            "enabled", os.getenv("KEYWORD_WARMING_ENABLED", "false").lower() == "true"
+        )
+        self.interval = options.get("interval", float(os.getenv("WARM_INTERVAL", 1)))
+        self.max_in_flight = options.get("max_in_flight", int(os.getenv("WARM_MAX_IN_FLIGHT", 1)))
+        # 至少保留的空闲页面数，留给突发的真实请求
+        self.reserve_pages = options.get("reserve_pages", int(os.getenv("WARM_RESERVE_PAGES", 1)))
+        # 估计频率达到该值才预取
+        self.min_count = options.get("min_count", float(os.getenv("WARM_MIN_COUNT", 3)))
+        # 热度半衰期（秒）
+        self.half_life = options.get("half_life", float(os.getenv("WARM_HALF_LIFE", 600)))
+        # 剩余有效时间低于 TTL 的该比例时刷新
+        self.refresh_ahead = options.get("refresh_ahead", 0.2)
+        # 真实请求排队后暂停预热的时间（秒）
+        self.backoff = options.get("backoff", 2.0)
+        # 预热抓取使用与 HTTP 接口默认值相同的超时和等待条件
+        self.fetch_options = {
+            "timeout": options.get("timeout", int(os.getenv("WARM_TIMEOUT", 30000))),
+            "wait_until": options.get("wait_until", "domcontentloaded"),
+        }
+
+        self.sketch = CountMinSketch(
+            options.get("sketch_width", 2048), options.get("sketch_depth", 4)
+        )
+        self.top_k = TopK(options.get("top_k", int(os.getenv("WARM_TOP_K", 100))))
+        self.cache = ResultCache(
+            options.get("cache_ttl", float(os.getenv("RESULT_CACHE_TTL", 60))),
+            options.get("cache_size", int(os.getenv("RESULT_CACHE_SIZE", 100))),
+        )
+
+        self.warm_tasks: Dict[str, asyncio.Task] = {}
+        self.warm_latency = LatencyTracker()
+        self.stats = {
+            "warm_scrapes": 0,
+            "warm_succeeded": 0,
+            "warm_failed": 0,
+            "warm_cancelled": 0,
+            "warm_page_ms": 0.0,
+        }
+
+        self._paused_until = 0.0
+        self._last_decay = time.time()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        self._logger = logging.getLogger(__name__)
+
+        if self.enabled:
+            scraper.on_page_wait = self.yield_to_traffic
+
+    def record(self, word: str):
+        """记录一次真实请求"""
+        self.top_k.offer(word, self.sketch.add(word))
+
+    async def fetch(self, word: str, options: Dict = None) -> Dict:
+        """服务入口：统计热度，命中缓存直接返回，否则抓取并缓存"""
+        if not self.enabled:
+            return await self.fetch_fn(word, options)
+
+        self.record(word)
+        if (options or {}).get("cache", True):
+            entry = self.cache.get(word)
+            if entry is not None:
+                return {
+                    **entry["result"],
+                    "cache": "hit",
+                    "cached_at": datetime.fromtimestamp(entry["cached_at"]).isoformat(),
+                    "age_ms": round((time.time() - entry["cached_at"]) * 1000),
+                }
+
+        result = await self.fetch_fn(word, options)
+        if result.get("success"):
+            self.cache.put(word, result)
+        return {**result, "cache": "miss"}
+
+    def yield_to_traffic(self):
+        """有请求排队等待页面：取消预热并暂停一段时间"""
+        self._paused_until = time.time() + self.backoff
+        for task in list(self.warm_tasks.values()):
+            task.cancel()
+
+    def _idle_pages(self) -> int:
+        scraper = self.scraper
+        if scraper.browser_restart_in_progress or scraper.waiting_queue or not scraper.is_initialized:
+            return 0
+        available = sum(
+            1 for p in scraper.page_pool if scraper.page_status.get(p["page"]) == "available"
+        )
+        return available - self.reserve_pages
+
+    def _candidates(self, limit: int) -> List[str]:
+        """需要预热的热门关键词：未缓存或即将过期"""
+        threshold = self.cache.ttl * self.refresh_ahead
+        selected = []
+        for word, score in self.top_k.items():
+            if len(selected) >= limit or score < self.min_count:
+                break
+            if word in self.warm_tasks:
+                continue
+            remaining = self.cache.expires_in(word)
+            if remaining is None or remaining < threshold:
+                selected.append(word)
+        return selected
+
+    async def _warm(self, word: str):
+        self.stats["warm_scrapes"] += 1
+        start = time.time()
+        try:
+            # warm 标记让 scrape_page 不把预热计入真实流量的延迟和成功率统计
+            result = await self.warm_fetch(word, {**self.fetch_options, "hedge": False, "warm": True})
+        except asyncio.CancelledError:
+            self.stats["warm_cancelled"] += 1
+            return
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            elapsed = (time.time() - start) * 1000
+            self.stats["warm_page_ms"] += elapsed
+            self.warm_tasks.pop(word, None)
+
+        self.warm_latency.record(elapsed)
+        if result.get("success"):
+            self.stats["warm_succeeded"] += 1
+            self.cache.put(word, result, warmed=True)
+        else:
+            self.stats["warm_failed"] += 1
+            self._logger.debug("Warm scrape failed for %s: %s", word, result.get("error"))
+
+    def _decay(self):
+        now = time.time()
+        elapsed = now - self._last_decay
+        if elapsed < self.interval * 10:
+            return
+        factor = 0.5 ** (elapsed / self.half_life)
+        self.sketch.decay(factor)
+        self.top_k.decay(factor)
+        self._last_decay = now
+
+    async def _warm_loop(self):
+        while self._running:
+            await asyncio.sleep(self.interval)
+            try:
+                self._decay()
+                if time.time() < self._paused_until:
+                    continue
+
+                slots = min(self.max_in_flight - len(self.warm_tasks), self._idle_pages())
+                for word in self._candidates(slots):
+                    self.warm_tasks[word] = asyncio.create_task(self._warm(word))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Keyword warm loop error: {e}")
+
+    async def start(self):
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._warm_loop())
+        self._logger.info(
+            f"Keyword warmer started (cache TTL {self.cache.ttl}s, top {self.top_k.k})"
+        )
+
+    async def stop(self):
+        self._running = False
+        tasks: Set[asyncio.Task] = set(self.warm_tasks.values())
+        if self._task:
+            tasks.add(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.warm_tasks.clear()
+        self._task = None
+
+    def get_stats(self) -> Dict:
+        warmed_hits = self.cache.stats["warmed_hits"]
+        return {
+            "enabled": self.enabled,
+            "cache": self.cache.get_stats(),
+            "warming": {
+                **self.stats,
+                "in_flight": len(self.warm_tasks),
+                "latency_ms": self.warm_latency.get_stats(),
+                # 每带来一次预热命中所花费的抓取次数
+                "scrapes_per_warmed_hit": (
+                    self.stats["warm_scrapes"] / warmed_hits if warmed_hits else None
+                ),
+            },
+            "hot_keywords": [
+                {"word": word, "score": round(score, 2)} for word, score in self.top_k.items()[:10]
+            ],
+        }
@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler
+from typing import Dict, List, Optional, TextIO
+
+# 当前请求的追踪 ID，asyncio 任务创建时自动继承
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+# 当前生效的分类过滤器，CategoryLogger 在创建 LogRecord 之前用它丢弃日志
+_active_filter: Optional["CategoryFilter"] = None
+
+
+def new_trace_id(trace_id: str = None) -> str:
+    """为当前上下文设置追踪 ID（未指定时生成新 ID）"""
+    # 追踪 ID 只需唯一，不需要密码学随机（uuid4 每次读取 urandom）
+    trace_id = trace_id or f"{random.getrandbits(64):016x}"
+    trace_id_var.set(trace_id)
+    return trace_id
+
+
+def get_trace_id() -> Optional[str]:
+    return trace_id_var.get()
+
+
+def category_logger(name: str, category: str) -> "CategoryLogger":
+    """热路径日志使用的分类 logger，按分类采样和限流"""
+    return CategoryLogger(logging.getLogger(name), category)
+
+
+def _parse_rules(value: str, cast) -> Dict:
+    """解析 "request=0.1,page=0.05" 形式的配置"""
+    rules = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            rules[name.strip()] = cast(number)
+    return rules
+
+
+class CategoryFilter(logging.Filter):
+    """按分类采样和限流，并附加追踪 ID
+
+    只作用于带 category 的 INFO 及以下日志，WARNING 及以上始终保留。
+    采样按计数进行（每 N 条保留 1 条），限流为每秒令牌桶。
+    """
+
+    def __init__(self, sample_rates: Dict[str, float] = None, rate_limits: Dict[str, float] = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self._counters: Dict[str, int] = {}
+        self._tokens: Dict[str, float] = {}
+        self._refilled_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {"passed": 0, "sampled_out": 0, "rate_limited": 0}
+
+    def _allow(self, category: str) -> bool:
+        rate = self.sample_rates.get(category, 1.0)
+        if rate <= 0:
+            self.stats["sampled_out"] += 1
+            return False
+        if rate < 1.0:
+            count = self._counters.get(category, 0)
+            self._counters[category] = count + 1
+            if count % round(1 / rate):
+                self.stats["sampled_out"] += 1
+                return False
+
+        limit = self.rate_limits.get(category)
+        if limit:
+            now = time.monotonic()
+            tokens = min(
+                limit,
+                self._tokens.get(category, limit)
+                + (now - self._refilled_at.get(category, now)) * limit,
+            )
+            self._refilled_at[category] = now
+            if tokens < 1:
+                self._tokens[category] = tokens
+                self.stats["rate_limited"] += 1
+                return False
+            self._tokens[category] = tokens - 1
+        return True
+
+    def allow(self, category: str) -> bool:
+        with self._lock:
+            return self._allow(category)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, "category", None)
+        if (
+            category
+            and record.levelno < logging.WARNING
+            # CategoryLogger 已在创建记录前判断过
+            and not getattr(record, "sampled", False)
+            and not self.allow(category)
+        ):
+            return False
+        record.trace_id = trace_id_var.get()
+        self.stats["passed"] += 1
+        return True
+
+
+class CategoryLogger(logging.LoggerAdapter):
+    """带分类的 logger：采样/限流在创建 LogRecord 之前判断，被丢弃的日志几乎没有开销
+
+    日志管道未启动时行为与普通 logger 相同。
+    """
+
+    def __init__(self, logger: logging.Logger, category: str):
+        super().__init__(logger, {"category": category, "sampled": True})
+        self.category = category
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        if level < logging.WARNING and _active_filter is not None and not _active_filter.allow(self.category):
+            return
+        if kwargs:
+            # exc_info / stack_info 等走完整路径
+            super().log(level, msg, *args, **kwargs)
+            return
+        # 分类已标明来源，跳过 findCaller 的调用栈遍历
+        logger = self.logger
+        logger.handle(
+            logger.makeRecord(logger.name, level, "(unknown file)", 0, msg, args, None, extra=self.extra)
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """单行 JSON 日志"""
+
+    def __init__(self):
+        super().__init__()
+        # json.dumps 带参数时每次都会新建编码器，这里复用
+        self._encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+        self._second = None
+        self._second_prefix = ""
+
+    def _timestamp(self, created: float) -> str:
+        """UTC ISO 时间，秒级前缀按秒缓存"""
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self._second_prefix}.{int((created - second) * 1e6):06d}+00:00"
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self._timestamp(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("category", "trace_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return self._encode(entry)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """入队不格式化消息，格式化在后台线程完成；队列满时丢弃并计数
+
+    使用无锁的 SimpleQueue，也不获取 Handler 自身的锁。
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if not self.filter(record):
+            return False
+        self.enqueue(record)
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内传递，无需像默认实现那样提前格式化并清空 args
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class BatchLogWriter(threading.Thread):
+    """后台写线程：一次取出队列中已有的全部日志，格式化后合并写入并 flush 一次"""
+
+    def __init__(self, log_queue: queue.SimpleQueue, stream: TextIO, formatter: logging.Formatter,
+                 batch_size: int = 1000):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for record in batch:
+                if record is None:
+                    stopping = True
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.errors += 1
+            if not lines:
+                continue
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+                self.batches += 1
+            except Exception:
+                self.errors += 1
+
+    def stop(self):
+        """写完已入队的日志后退出"""
+        self.queue.put(None)
+        self.join()
+
+
+class LoggingPipeline:
+    """日志管道：调用方只做过滤和入队，由 BatchLogWriter 线程格式化和批量写出"""
+
+    def __init__(self, options: Dict = None):
+        options = options or {}
+
+        self.level = options.get("level", os.getenv("LOG_LEVEL", "INFO")).upper()
+        self.format = options.get("format", os.getenv("LOG_FORMAT", "json"))
+        self.queue_size = options.get("queue_size", int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+        self.file = options.get("file", os.getenv("LOG_FILE"))
+        self.sample_rates = options.get(
+            "sample_rates", _parse_rules(os.getenv("LOG_SAMPLING", "page=0.1,concurrency=0.01"), float)
+        )
+        self.rate_limits = options.get(
+            "rate_limits", _parse_rules(os.getenv("LOG_RATE_LIMIT", "request=50,page=20,wait=1"), float)
+        )
+
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.filter = CategoryFilter(self.sample_rates, self.rate_limits)
+        self.handler = NonBlockingQueueHandler(self.queue, self.queue_size)
+        self.handler.addFilter(self.filter)
+        self.writer: Optional[BatchLogWriter] = None
+        self._stream: Optional[TextIO] = None
+        self._previous_handlers: List[logging.Handler] = []
+        self._previous_level = logging.WARNING
+
+    def _create_formatter(self) -> logging.Formatter:
+        if self.format == "json":
+            return JsonFormatter()
+        return logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s")
+
+    def start(self):
+        """替换根 logger 的处理器并启动后台写线程"""
+        global _active_filter
+        if self.writer and self.writer.is_alive():
+            return
+        _active_filter = self.filter
+
+        self._stream = open(self.file, "a", encoding="utf-8") if self.file else sys.stderr
+        self.writer = BatchLogWriter(self.queue, self._stream, self._create_formatter())
+        self.writer.start()
+
+        root = logging.getLogger()
+        self._previous_handlers = root.handlers[:]
+        self._previous_level = root.level
+        for handler in self._previous_handlers:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+
+    def stop(self):
+        """写完队列中剩余的日志并恢复原处理器"""
+        global _active_filter
+        if not self.writer or not self.writer.is_alive():
+            return
+        if _active_filter is self.filter:
+            _active_filter = None
+
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        for handler in self._previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(self._previous_level)
+
+        self.writer.stop()
+        if self.file:
+            self._stream.close()
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.filter.stats,
+            "dropped": self.handler.dropped,
+            "queued": self.queue.qsize(),
+            "written": self.writer.written if self.writer else 0,
+            "write_batches": self.writer.batches if self.writer else 0,
+            "write_errors": self.writer.errors if self.writer else 0,
+            "sample_rates": self.sample_rates,
+            "rate_limits": self.rate_limits,
+        }
+
+
+def setup_logging(options: Dict = None) -> LoggingPipeline:
+    pipeline = LoggingPipeline(options)
+    pipeline.start()
+    return pipeline
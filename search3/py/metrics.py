@@ -0,0 +1,38 @@
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """滑动窗口延迟统计（毫秒）"""
+
+    def __init__(self, window_size: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=window_size)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, latency_ms: float):
+        self.samples.append(latency_ms)
+        self.count += 1
+        self.total += latency_ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """窗口内第 p 百分位，样本为空时返回 None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def mean(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def get_stats(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
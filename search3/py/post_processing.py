@@ -0,0 +1,237 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+import logging
+import multiprocessing
+from metrics import LatencyTracker
+
+RESULT_HEADING_PATTERN = re.compile(r"<h3[^>]*>(.*?)</h3>", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+# 处理器在工作进程中执行，必须是模块级函数：(word, content, fields) -> 新增字段
+def measure_processor(word: str, content: str, fields: Dict) -> Dict:
+    """内容长度统计"""
+    return {"content_length": len(content), "content_bytes": len(content.encode("utf-8"))}
+
+
+def hash_processor(word: str, content: str, fields: Dict) -> Dict:
+    """内容哈希，用于去重"""
+    return {"content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest()}
+
+
+def extract_processor(word: str, content: str, fields: Dict) -> Dict:
+    """提取搜索结果标题"""
+    titles = [
+        TAG_PATTERN.sub("", match).strip()
+        for match in RESULT_HEADING_PATTERN.findall(content)
+    ]
+    return {"result_titles": [t for t in titles if t]}
+
+
+def compress_processor(word: str, content: str, fields: Dict) -> Dict:
+    """gzip 压缩后的大小"""
+    return {"compressed_bytes": len(gzip.compress(content.encode("utf-8"), compresslevel=6))}
+
+
+def save_processor(word: str, content: str, fields: Dict) -> Dict:
+    """保存内容到文件（与 scraper.save_content 相同的目录和格式）"""
+    output_dir = "scraped-content"
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f"{output_dir}/{word}.html", "a", encoding="utf-8") as f:
+        f.write(content + "\r\n")
+    return {}
+
+
+PROCESSORS: Dict[str, Callable[[str, str, Dict], Dict]] = {
+    "measure": measure_processor,
+    "hash": hash_processor,
+    "extract": extract_processor,
+    "compress": compress_processor,
+    "save": save_processor,
+}
+
+# 占用 CPU 的处理器，链中包含时才使用进程池；其余在线程池中执行，
+# 避免把整页内容序列化传给工作进程
+CPU_BOUND_PROCESSORS = {"hash", "extract", "compress"}
+
+
+def run_chain(names: List[str], word: str, content: str) -> Dict:
+    """在工作进程中依次执行处理器，返回新增字段和各阶段耗时（毫秒）"""
+    fields: Dict = {}
+    timings: Dict[str, float] = {}
+    for name in names:
+        start = time.perf_counter()
+        fields.update(PROCESSORS[name](word, content, fields))
+        timings[name] = (time.perf_counter() - start) * 1000
+    return {"fields": fields, "timings": timings}
+
+
+class EventLoopLagMonitor:
+    """事件循环延迟监控：定时 sleep，实际唤醒时间与预期的差值即为阻塞时长"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lag = LatencyTracker()
+        self.max_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.lag.record(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def get_stats(self) -> Dict:
+        return {**self.lag.get_stats(), "max": self.max_lag_ms}
+
+
+class PostProcessingPipeline:
+    """抓取内容后处理：在进程池（含 CPU 密集处理器时）或线程池中执行处理器链，事件循环只负责调度
+
+    同时在途的任务数受 max_in_flight 限制；排队数超过 max_queue 时按
+    overflow 策略处理：block 让调用方等待（背压），skip 跳过后处理。
+    """
+
+    def __init__(self, options: Dict = None):
+        options = options or {}
+
+        self.processors: List[str] = options.get(
+            "processors",
+            [p.strip() for p in os.getenv("POST_PROCESSORS", "").split(",") if p.strip()],
+        )
+        unknown = [p for p in self.processors if p not in PROCESSORS]
+        if unknown:
+            raise ValueError(f"Unknown post processors: {', '.join(unknown)}")
+        self.use_processes = options.get(
+            "use_processes", any(p in CPU_BOUND_PROCESSORS for p in self.processors)
+        )
+
+        self.max_workers = options.get(
+            "max_workers", int(os.getenv("POST_PROCESS_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+        )
+        self.max_in_flight = options.get("max_in_flight", self.max_workers * 2)
+        self.max_queue = options.get(
+            "max_queue", int(os.getenv("POST_PROCESS_MAX_QUEUE", 100))
+        )
+        self.overflow = options.get("overflow", os.getenv("POST_PROCESS_OVERFLOW", "block"))
+        # 去重：最近出现过的内容哈希 -> 首次出现的关键词
+        self.dedup_size = options.get("dedup_size", 10000)
+
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._queued = 0
+        self._in_flight = 0
+        self._seen_hashes: "OrderedDict[str, str]" = OrderedDict()
+
+        self.stage_latency: Dict[str, LatencyTracker] = {
+            name: LatencyTracker() for name in self.processors + ["queue_wait", "total"]
+        }
+        self.stats = {"processed": 0, "failed": 0, "skipped": 0, "duplicates": 0}
+
+        self._logger = logging.getLogger(__name__)
+
+    def start(self):
+        if self._executor is None and self.use_processes:
+            # 使用 spawn：fork 会复制已启动的线程（日志写线程、Playwright 连接）的锁状态。
+            # spawn 的工作进程启动时会重新导入主模块，只在启动时付出一次
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        elif self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="post-process"
+            )
+        self._logger.info(
+            f"Post-processing pipeline started: {self.processors} "
+            f"({self.max_workers} {'processes' if self.use_processes else 'threads'})"
+        )
+
+    async def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def process(self, word: str, content: str) -> Optional[Dict]:
+        """执行处理器链，返回新增字段；队列已满且策略为 skip 时返回 None"""
+        if self._executor is None:
+            self.start()
+
+        if self._queued >= self.max_queue and self.overflow == "skip":
+            self.stats["skipped"] += 1
+            return None
+
+        start = time.perf_counter()
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        self.stage_latency["queue_wait"].record((time.perf_counter() - start) * 1000)
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_event_loop()
+            output = await loop.run_in_executor(
+                self._executor, run_chain, self.processors, word, content
+            )
+        except Exception as e:
+            self.stats["failed"] += 1
+            self._logger.error(f"Post-processing failed for {word}: {e}")
+            if isinstance(e, BrokenProcessPool) and self._executor:
+                # 工作进程异常退出后进程池不可再用，下次调用时重建
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            return None
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+        for name, elapsed in output["timings"].items():
+            self.stage_latency[name].record(elapsed)
+        self.stage_latency["total"].record((time.perf_counter() - start) * 1000)
+        self.stats["processed"] += 1
+
+        fields = output["fields"]
+        content_hash = fields.get("content_hash")
+        if content_hash:
+            first_word = self._seen_hashes.get(content_hash)
+            if first_word is not None and first_word != word:
+                fields["duplicate_of"] = first_word
+                self.stats["duplicates"] += 1
+            else:
+                self._seen_hashes[content_hash] = word
+                if len(self._seen_hashes) > self.dedup_size:
+                    self._seen_hashes.popitem(last=False)
+        return fields
+
+    def get_stats(self) -> Dict:
+        return {
+            "processors": self.processors,
+            "workers": self.max_workers,
+            "executor": "process" if self.use_processes else "thread",
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            **self.stats,
+            "stages_ms": {name: t.get_stats() for name, t in self.stage_latency.items()},
+        }
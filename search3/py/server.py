@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
@@ -6,24 +6,49 @@ import os
 import asyncio
 from scraper import WebScraper
 from concurrency_controller import ConcurrencyController
+from fetch_engine import TieredFetchEngine
+from health_supervisor import HealthSupervisor
+from post_processing import EventLoopLagMonitor, PostProcessingPipeline
+from ws_session import PipelinedScrapeSession
+from log_pipeline import category_logger, new_trace_id, setup_logging
+from keyword_warmer import KeywordWarmer
+from distributed_scheduler import DistributedScheduler, MemoryQueueBackend, RedisQueueBackend
 import logging
 
+REQUEST_LOG = category_logger(__name__, "request")
+
 # 请求模型
 class ScrapeRequest(BaseModel):
     word: str
     timeout: Optional[int] = 30000
     wait_until: Optional[str] = "domcontentloaded"
+    # 关键词预热开启时，False 表示绕过结果缓存
+    cache: Optional[bool] = True
 
 class BatchScrapeRequest(BaseModel):
     words: List[str]
     timeout: Optional[int] = 30000
     wait_until: Optional[str] = "domcontentloaded"
+    # 关键词预热开启时，False 表示绕过结果缓存
+    cache: Optional[bool] = True
 
 class ConcurrencyConfig(BaseModel):
     max_concurrent: int
 
+class TaskRequest(BaseModel):
+    word: str
+    timeout: Optional[int] = 30000
+    wait_until: Optional[str] = "domcontentloaded"
+    priority: Optional[int] = 0
+    delay_ms: Optional[int] = 0
+
 class ScrapingServer:
     def __init__(self):
+        # 日志由后台线程写出，热路径日志按分类采样
+        self.logging_pipeline = None
+        if os.getenv('LOG_PIPELINE_ENABLED', 'true').lower() == 'true':
+            self.logging_pipeline = setup_logging()
+
         self.app = FastAPI(title="Web Scraping Service", version="1.0.0")
         
         # 从环境变量获取配置
@@ -39,15 +64,56 @@ class ScrapingServer:
             'initial_page_pool_size': initial_page_pool_size
         })
         
+        # 抓取内容后处理（默认关闭，在事件循环内用 aiofiles 直接保存）；
+        # POST_PROCESSORS 含 hash/extract/compress 时才启动进程池
+        if os.getenv('POST_PROCESSORS', '').strip():
+            self.scraper.post_processor = PostProcessingPipeline()
+        self.loop_lag = EventLoopLagMonitor()
+
+        # 页面与浏览器健康巡检
+        self.health_supervisor = None
+        if os.getenv('HEALTH_SUPERVISOR_ENABLED', 'true').lower() == 'true':
+            self.health_supervisor = HealthSupervisor(self.scraper)
+
+        # 分层抓取：HTTP 优先，失败再使用浏览器页面
+        self.fetch_engine = TieredFetchEngine(self.scraper)
+
         self.concurrency_controller = ConcurrencyController(max_concurrent)
         self.port = int(os.getenv('PORT', 3000))
+
+        # 热门关键词结果缓存与空闲时预热，预热抓取不经过并发控制
+        self.warmer = KeywordWarmer(
+            self.scraper,
+            lambda word, options: self.concurrency_controller.execute(self.fetch_engine.fetch, word, options),
+            {'warm_fetch': self.fetch_engine.fetch}
+        )
+
+        # 分布式调度（多节点共享队列），SCHEDULER_BACKEND=redis|memory
+        self.scheduler = None
+        scheduler_backend = os.getenv('SCHEDULER_BACKEND', '').lower()
+        if scheduler_backend == 'redis':
+            self.scheduler = DistributedScheduler(
+                self.scraper, RedisQueueBackend(os.getenv('REDIS_URL')), {'fetch': self.fetch_engine.fetch}
+            )
+        elif scheduler_backend == 'memory':
+            self.scheduler = DistributedScheduler(
+                self.scraper, MemoryQueueBackend(), {'fetch': self.fetch_engine.fetch}
+            )
         
         self._setup_routes()
         self._logger = logging.getLogger(__name__)
 
     def _setup_routes(self):
         """设置路由"""
-        
+
+        @self.app.middleware("http")
+        async def trace_requests(request: Request, call_next):
+            # 每个请求一个追踪 ID，可由调用方通过 X-Trace-Id 传入
+            trace_id = new_trace_id(request.headers.get("x-trace-id"))
+            response = await call_next(request)
+            response.headers["X-Trace-Id"] = trace_id
+            return response
+
         @self.app.get("/health")
         async def health_check():
             scraper_status = self.scraper.get_status()
@@ -55,7 +121,14 @@ class ScrapingServer:
                 "status": "OK",
                 "timestamp": datetime.now().isoformat(),
                 "concurrency": self.concurrency_controller.get_stats(),
-                "scraper": scraper_status
+                "scraper": scraper_status,
+                "supervisor": self.health_supervisor.get_stats() if self.health_supervisor else None,
+                "post_processing": (
+                    self.scraper.post_processor.get_stats() if self.scraper.post_processor else None
+                ),
+                "event_loop_lag_ms": self.loop_lag.get_stats(),
+                "logging": self.logging_pipeline.get_stats() if self.logging_pipeline else None,
+                "warming": self.warmer.get_stats()
             }
 
         @self.app.post("/scrape")
@@ -63,19 +136,21 @@ class ScrapingServer:
             if not request.word:
                 raise HTTPException(status_code=400, detail="Word is required")
 
-            self._logger.info(f"Processing scrape request for: {request.word}")
+            REQUEST_LOG.info("Processing scrape request for: %s", request.word)
 
             try:
-                # 注意：这里需要实现 ConcurrencyController 的 execute 方法
-                result = await self.scraper.scrape_page(
-                    request.word, 
+                result = await self.warmer.fetch(
+                    request.word,
                     {
                         'timeout': request.timeout,
-                        'wait_until': request.wait_until
+                        'wait_until': request.wait_until,
+                        'cache': request.cache
                     }
                 )
                 
-                self._logger.info(f"Scrape result for {request.word}: {result.get('response_time', 0)}ms")
+                REQUEST_LOG.info(
+                    "Scrape result for %s: %sms", request.word, result.get('response_time', 0)
+                )
                 
                 if result['success']:
                     return result
@@ -94,14 +169,15 @@ class ScrapingServer:
             if len(request.words) > 10:
                 raise HTTPException(status_code=400, detail="Maximum 10 words allowed per batch request")
 
-            self._logger.info(f"Processing batch request for {len(request.words)} words")
+            REQUEST_LOG.info("Processing batch request for %d words", len(request.words))
 
             try:
                 tasks = []
                 for word in request.words:
-                    task = self.scraper.scrape_page(word, {
+                    task = self.warmer.fetch(word, {
                         'timeout': request.timeout,
-                        'wait_until': request.wait_until
+                        'wait_until': request.wait_until,
+                        'cache': request.cache
                     })
                     tasks.append(task)
 
@@ -129,6 +205,12 @@ class ScrapingServer:
                 self._logger.error(f"Batch scrape endpoint error: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.websocket("/ws/scrape")
+        async def scrape_websocket(websocket: WebSocket):
+            session = PipelinedScrapeSession(websocket, self.warmer.fetch, self.scraper)
+            await session.run()
+            self._logger.info(f"WebSocket session closed: {session.stats}")
+
         @self.app.post("/restart-browser")
         async def restart_browser():
             self._logger.info("Manual browser restart requested")
@@ -143,6 +225,48 @@ class ScrapingServer:
                 self._logger.error(f"Manual browser restart failed: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.post("/tasks")
+        async def submit_task(request: TaskRequest):
+            if not self.scheduler:
+                raise HTTPException(status_code=404, detail="Distributed scheduler is not enabled")
+            if not request.word:
+                raise HTTPException(status_code=400, detail="Word is required")
+
+            task_id = await self.scheduler.submit(
+                request.word,
+                {
+                    'timeout': request.timeout,
+                    'wait_until': request.wait_until
+                },
+                priority=request.priority,
+                delay_ms=request.delay_ms
+            )
+            return {"success": True, "task_id": task_id}
+
+        @self.app.get("/tasks/{task_id}")
+        async def get_task_result(task_id: str):
+            if not self.scheduler:
+                raise HTTPException(status_code=404, detail="Distributed scheduler is not enabled")
+
+            result = await self.scheduler.get_result(task_id)
+            if result is None:
+                return {"task_id": task_id, "status": "pending"}
+            return {"task_id": task_id, "status": "done", "result": result}
+
+        @self.app.get("/cluster")
+        async def get_cluster():
+            if not self.scheduler:
+                raise HTTPException(status_code=404, detail="Distributed scheduler is not enabled")
+            return await self.scheduler.get_status()
+
+        @self.app.get("/tiers")
+        async def get_tiers():
+            return self.fetch_engine.get_stats()
+
+        @self.app.get("/warming")
+        async def get_warming():
+            return self.warmer.get_stats()
+
         @self.app.get("/config")
         async def get_config():
             scraper_status = self.scraper.get_status()
@@ -178,6 +302,14 @@ class ScrapingServer:
         try:
             # 初始化浏览器
             await self.scraper.initialize()
+            if self.scraper.post_processor:
+                self.scraper.post_processor.start()
+            self.loop_lag.start()
+            if self.health_supervisor:
+                await self.health_supervisor.start()
+            if self.scheduler:
+                await self.scheduler.start()
+            await self.warmer.start()
             
             config = uvicorn.Config(
                 self.app, 
@@ -199,7 +331,19 @@ class ScrapingServer:
     async def graceful_shutdown(self):
         """优雅关闭"""
         self._logger.info("Shutting down gracefully...")
+        await self.warmer.stop()
+        if self.scheduler:
+            await self.scheduler.stop()
+            await self.scheduler.backend.close()
+        if self.health_supervisor:
+            await self.health_supervisor.stop()
+        await self.fetch_engine.close()
+        await self.loop_lag.stop()
+        if self.scraper.post_processor:
+            await self.scraper.post_processor.close()
         await self.scraper.close()
+        if self.logging_pipeline:
+            self.logging_pipeline.stop()
 
 # 启动服务器
 if __name__ == "__main__":
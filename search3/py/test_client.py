@@ -1,5 +1,6 @@
 import asyncio
 import aiohttp
+import sys
 import time
 from typing import List, Dict, Any
 import random
@@ -123,6 +124,89 @@ class ConcurrencyTestClient:
         total_time = time.time() - start_time
         return self.generate_report(results, total_time)
 
+    async def run_http_test(self, words: List[str], concurrency: int) -> Dict[str, Any]:
+        """逐请求 HTTP：保持 concurrency 个请求在途（无批次间等待）"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(word: str, request_id: int):
+            async with semaphore:
+                return await self.single_request(word, request_id)
+
+        start_time = time.time()
+        results = await asyncio.gather(*[limited(w, i) for i, w in enumerate(words)])
+        return self.generate_report(list(results), time.time() - start_time)
+
+    async def run_ws_test(self, words: List[str]) -> Dict[str, Any]:
+        """WebSocket 长连接流水线：按服务端授予的额度持续发送，结果按 id 归并"""
+        ws_url = self.base_url.replace("http", "ws", 1) + "/ws/scrape"
+        results: Dict[str, Dict] = {}
+        sent_at: Dict[str, float] = {}
+        credits = 0
+        next_index = 0
+
+        start_time = time.time()
+        async with self.session.ws_connect(ws_url) as ws:
+            while len(results) < len(words):
+                # 用完当前额度
+                while credits > 0 and next_index < len(words):
+                    request_id = str(next_index)
+                    sent_at[request_id] = time.time()
+                    await ws.send_json({"id": request_id, "word": words[next_index], "timeout": 30000})
+                    credits -= 1
+                    next_index += 1
+
+                message = await ws.receive_json()
+                msg_type = message.get("type")
+                if msg_type == "credit":
+                    credits += message["credits"]
+                    continue
+
+                request_id = message.get("id")
+                response_time = (time.time() - sent_at.get(request_id, start_time)) * 1000
+                if msg_type == "result":
+                    credits += message.get("credits", 0)
+                    data = message["result"]
+                    results[request_id] = {
+                        "id": int(request_id),
+                        "word": data.get("word"),
+                        "success": data.get("success", False),
+                        "response_time": response_time,
+                        "data_length": len(data.get("content", "") or ""),
+                        "title": data.get("title", "N/A"),
+                        "error": data.get("error"),
+                    }
+                elif msg_type == "error" and request_id is not None:
+                    results[request_id] = {
+                        "id": int(request_id),
+                        "success": False,
+                        "response_time": response_time,
+                        "error": message.get("error"),
+                    }
+
+        total_time = time.time() - start_time
+        return self.generate_report(list(results.values()), total_time)
+
+    async def compare_ws_http(self, options: Dict = None) -> Dict[str, Any]:
+        """相同请求数、相同在途数下对比 WebSocket 流水线与逐请求 HTTP
+
+        两轮使用不同的关键词，避免第二轮命中服务端结果缓存
+        """
+        options = options or {}
+        total_requests = options.get('total_requests', 50)
+        concurrency = options.get('concurrency', 10)
+
+        print(f"🚀 HTTP per-request ({concurrency} in flight)")
+        http_report = await self.run_http_test(self.generate_test_words(total_requests), concurrency)
+        print("\n🚀 WebSocket pipelined (server-granted credits)")
+        ws_report = await self.run_ws_test(self.generate_test_words(total_requests))
+
+        gain = ws_report['qps'] / http_report['qps'] if http_report['qps'] else 0
+        latency_delta = http_report['avg_response_time'] - ws_report['avg_response_time']
+        print('\n' + '=' * 60)
+        print(f"WebSocket QPS gain: {gain:.2f}x")
+        print(f"Average latency saved per request: {latency_delta:.2f}ms")
+        return {'http': http_report, 'ws': ws_report, 'qps_gain': gain}
+
     def generate_report(self, results: List[Dict], total_time: float) -> Dict[str, Any]:
         """生成测试报告"""
         successful = [r for r in results if r['success']]
@@ -167,6 +251,14 @@ class ConcurrencyTestClient:
 async def main():
     """主函数"""
     async with ConcurrencyTestClient() as client:
+        if len(sys.argv) > 1 and sys.argv[1] == "ws":
+            # python test_client.py ws [total_requests] [concurrency]
+            await client.compare_ws_http({
+                'total_requests': int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+                'concurrency': int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+            })
+            return
+
         # 运行并发测试
         report = await client.run_concurrency_test({
             'concurrency': 1,
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+from distributed_scheduler import DistributedScheduler, MemoryQueueBackend, _now_ms
+
+
+class FakeScraper:
+    initial_page_pool_size = 2
+
+    def __init__(self, delay: float = 0.0, success: bool = True):
+        self.delay = delay
+        self.success = success
+        self.calls = []
+
+    async def scrape_page(self, word, options=None):
+        self.calls.append(word)
+        await asyncio.sleep(self.delay)
+        return {"success": self.success, "word": word}
+
+
+def make_scheduler(backend, scraper, node_id="node-a", **options):
+    return DistributedScheduler(scraper, backend, {
+        "node_id": node_id,
+        "poll_interval": 0.01,
+        "heartbeat_interval": 0.02,
+        **options,
+    })
+
+
+async def wait_for_result(scheduler, task_id, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        result = await scheduler.get_result(task_id)
+        if result:
+            return result
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"no result for {task_id}")
+
+
+def test_claimed_task_is_acked_and_result_stored():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        scheduler = make_scheduler(backend, FakeScraper())
+        task_id = await scheduler.submit("hello")
+        await scheduler.start()
+        result = await wait_for_result(scheduler, task_id)
+        await scheduler.stop()
+        return backend, scheduler, result
+
+    backend, scheduler, result = asyncio.run(scenario())
+    assert result["success"] and result["word"] == "hello"
+    assert result["node_id"] == "node-a" and result["attempts"] == 1
+    assert scheduler.stats["completed"] == 1
+    # 确认后不再留有租约和任务内容
+    assert not backend.leases and not backend.owners and not backend.tasks
+    assert "node-a" not in backend.nodes
+
+
+def test_claim_respects_score_order_and_delay():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        now = _now_ms()
+        await backend.enqueue("later", "{}", now + 60000)
+        await backend.enqueue("low", "{}", now)
+        await backend.enqueue("high", "{}", now - 1000)
+        return await backend.claim("node-a", now, 1000, 10)
+
+    claimed = asyncio.run(scenario())
+    assert [task_id for task_id, _, _ in claimed] == ["high", "low"]
+
+
+def test_expired_lease_is_requeued_for_another_node():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        now = _now_ms()
+        await backend.enqueue("t1", json.dumps({"word": "w"}), now)
+        await backend.claim("dead-node", now, 100, 1)
+
+        assert await backend.requeue_expired(now + 50, 3, 60) == (0, 0)
+        assert await backend.requeue_expired(now + 100, 3, 60) == (1, 0)
+
+        # 原节点的租约已失效，不能再确认或写回
+        assert not await backend.ack("t1", "dead-node")
+        claimed = await backend.claim("node-b", now + 100, 100, 1)
+        return backend, claimed
+
+    backend, claimed = asyncio.run(scenario())
+    assert claimed == [("t1", json.dumps({"word": "w"}), 2)]
+    assert backend.owners["t1"] == "node-b"
+
+
+def test_task_moves_to_dead_letter_after_max_attempts():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        scheduler = make_scheduler(backend, FakeScraper(), max_attempts=3)
+        task_id = await scheduler.submit("poison")
+
+        now = _now_ms()
+        for attempt in range(3):
+            now += 1000
+            await backend.claim("crashing-node", now, 100, 1)
+            requeued, dead = await backend.requeue_expired(now + 100, 3, 60)
+        return backend, task_id, (requeued, dead), await scheduler.get_result(task_id)
+
+    backend, task_id, counts, result = asyncio.run(scenario())
+    assert counts == (0, 1)
+    assert task_id in backend.dead and task_id not in backend.queue
+    assert result["success"] is False and result["word"] == "poison"
+    assert result["attempts"] == 3
+
+
+def test_first_result_wins():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        scheduler = make_scheduler(backend, FakeScraper())
+        task_id = await scheduler.submit("dup")
+        # 另一节点已写入结果（如租约过期后重复执行）
+        await backend.set_result(task_id, json.dumps({"success": True, "node_id": "node-b"}), 60)
+        await scheduler.start()
+        while scheduler.stats["claimed"] == 0 or scheduler._in_flight:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return scheduler, await scheduler.get_result(task_id)
+
+    scheduler, result = asyncio.run(scenario())
+    assert result["node_id"] == "node-b"
+    assert scheduler.stats["duplicate_results"] == 1
+
+
+def test_slow_task_keeps_lease_and_runs_once():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        slow = FakeScraper(delay=0.5)
+        other = FakeScraper()
+        lease = {"lease_ms": 100}
+        node_a = make_scheduler(backend, slow, "node-a", **lease)
+        node_b = make_scheduler(backend, other, "node-b", **lease)
+
+        task_id = await node_a.submit("slow")
+        await node_a.start()
+        while not node_a._in_flight:
+            await asyncio.sleep(0.01)
+        await node_b.start()
+        result = await wait_for_result(node_a, task_id)
+        await node_a.stop()
+        await node_b.stop()
+        return node_a, slow, other, result
+
+    node_a, slow, other, result = asyncio.run(scenario())
+    assert result["node_id"] == "node-a"
+    assert slow.calls == ["slow"] and other.calls == []
+    assert node_a.stats["leases_renewed"] > 0
+    assert node_a.stats["duplicate_results"] == 0
+
+
+def test_stop_keeps_renewing_until_in_flight_tasks_finish():
+    async def scenario():
+        backend = MemoryQueueBackend()
+        slow = FakeScraper(delay=0.4)
+        other = FakeScraper()
+        lease = {"lease_ms": 100}
+        node_a = make_scheduler(backend, slow, "node-a", **lease)
+        node_b = make_scheduler(backend, other, "node-b", **lease)
+
+        task_id = await node_a.submit("shutdown")
+        await node_a.start()
+        while not node_a._in_flight:
+            await asyncio.sleep(0.01)
+        await node_b.start()
+        # 停机期间任务仍在执行，租约必须持续续期
+        await node_a.stop()
+        result = await node_b.get_result(task_id)
+        await asyncio.sleep(0.2)
+        await node_b.stop()
+        return slow, other, result
+
+    slow, other, result = asyncio.run(scenario())
+    assert result["node_id"] == "node-a"
+    assert slow.calls == ["shutdown"] and other.calls == []
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from failures import FailureType, classify_exception, classify_page
+
+
+class TimeoutError(Exception):
+    """与 playwright.async_api.TimeoutError 同名，不继承内置 TimeoutError"""
+
+
+class Error(Exception):
+    """与 playwright.async_api.Error 同名"""
+
+
+SEARCH_URL = "https://www.google.com/search?q=order+4070"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TimeoutError("Timeout 4070ms exceeded."),
+        TimeoutError(f'page.wait_for_url: Timeout 30000ms exceeded.\nwaiting for navigation to "{SEARCH_URL}"'),
+        asyncio.TimeoutError(),
+        TimeoutError("net::ERR_PROXY_CONNECTION_FAILED"),
+    ],
+)
+def test_timeouts_are_classified_by_type(error):
+    assert classify_exception(error) == FailureType.TIMEOUT
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "page.goto: net::ERR_PROXY_CONNECTION_FAILED at https://www.google.com/",
+        "page.goto: net::ERR_PROXY_AUTH_UNSUPPORTED at https://www.google.com/",
+        "page.goto: net::ERR_TUNNEL_CONNECTION_FAILED at https://www.google.com/",
+        "page.goto: net::ERR_CONNECTION_RESET at https://www.google.com/",
+        "407 Proxy Authentication Required",
+    ],
+)
+def test_proxy_errors(message):
+    assert classify_exception(Error(message)) == FailureType.PROXY
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "status 4070",
+        f"page.goto: navigation failed at {SEARCH_URL}",
+        "page.goto: failed at https://www.google.com/search?q=ERR_PROXY",
+        "Timeout in query text",
+    ],
+)
+def test_unrelated_errors_are_unknown(message):
+    assert classify_exception(Error(message)) == FailureType.UNKNOWN
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Target crashed",
+        "page.fill: Target page, context or browser has been closed",
+    ],
+)
+def test_crash_errors(message):
+    assert classify_exception(Error(message)) == FailureType.CRASH
+
+
+def test_interstitial_url_takes_precedence():
+    url = "https://www.google.com/sorry/index?continue=x"
+    assert classify_exception(TimeoutError("Timeout 30000ms exceeded."), url) == FailureType.CAPTCHA
+
+
+def test_classify_page():
+    assert classify_page("https://consent.google.com/ml?continue=x") == FailureType.CAPTCHA
+    assert classify_page(SEARCH_URL, '<form id="captcha-form">') == FailureType.CAPTCHA
+    assert classify_page(SEARCH_URL, "<div id='search'>results</div>") is None
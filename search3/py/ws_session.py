@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+from typing import Callable, Dict, Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect
+import logging
+from log_pipeline import new_trace_id
+
+
+class PipelinedScrapeSession:
+    """WebSocket 长连接上的流水线抓取会话
+
+    协议（JSON 帧）：
+      服务端 -> {"type": "credit", "credits": n}              授予可再发送的请求数
+      客户端 -> {"id": "...", "word": "...", "timeout": ..., "cache": ...}   每个请求消耗 1 个额度
+      服务端 -> {"type": "result", "id": "...", "result": {...}, "credits": n}
+      服务端 -> {"type": "error", "id": "...", "error": "..."}
+
+    结果按完成顺序返回。请求完成后归还额度，但页面池出现排队时暂缓归还，
+    让客户端的发送速度跟随池容量。
+    """
+
+    def __init__(self, websocket: WebSocket, scrape: Callable, scraper, options: Dict = None):
+        options = options or {}
+
+        self.websocket = websocket
+        self.scrape = scrape
+        self.scraper = scraper
+        self.window = options.get(
+            "window",
+            int(os.getenv("WS_MAX_IN_FLIGHT", scraper.initial_page_pool_size * 2)),
+        )
+
+        self.credits = 0
+        self.withheld = 0
+        self.tasks: Set[asyncio.Task] = set()
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+
+        self.stats = {"received": 0, "completed": 0, "rejected": 0, "invalid": 0}
+        self._logger = logging.getLogger(__name__)
+
+    async def _send(self, message: Dict):
+        if self._closed:
+            return
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    def _has_capacity(self) -> bool:
+        return not self.scraper.waiting_queue and not self.scraper.browser_restart_in_progress
+
+    def _grant(self, count: int) -> int:
+        """授予额度，池已饱和时暂缓"""
+        self.withheld += count
+        if not self._has_capacity():
+            return 0
+        granted, self.withheld = self.withheld, 0
+        self.credits += granted
+        return granted
+
+    async def run(self):
+        await self.websocket.accept()
+        self.credits = self.window
+        await self._send({"type": "credit", "credits": self.window})
+
+        flusher = asyncio.create_task(self._flush_withheld())
+        try:
+            while True:
+                message = await self._receive_message()
+                if message is None:
+                    continue
+                request_id = message.get("id")
+                word = message.get("word")
+
+                if not word or not isinstance(word, str):
+                    await self._send({"type": "error", "id": request_id, "error": "Word is required"})
+                    continue
+                if self.credits <= 0:
+                    self.stats["rejected"] += 1
+                    await self._send({"type": "error", "id": request_id, "error": "No credits available"})
+                    continue
+
+                self.credits -= 1
+                self.stats["received"] += 1
+                task = asyncio.create_task(self._handle(request_id, word, message))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            flusher.cancel()
+            for task in list(self.tasks):
+                task.cancel()
+            await asyncio.gather(flusher, *self.tasks, return_exceptions=True)
+
+    async def _receive_message(self) -> Optional[Dict]:
+        """读取一帧请求；格式错误的帧回复 error 后忽略，不影响连接上的其他请求"""
+        try:
+            message = json.loads(await self.websocket.receive_text())
+        except (ValueError, KeyError, TypeError) as e:
+            # KeyError：收到二进制帧
+            self.stats["invalid"] += 1
+            await self._send({"type": "error", "id": None, "error": f"Invalid frame: {e!r}"})
+            return None
+        if not isinstance(message, dict):
+            self.stats["invalid"] += 1
+            await self._send({"type": "error", "id": None, "error": "Frame must be a JSON object"})
+            return None
+        return message
+
+    async def _handle(self, request_id: str, word: str, message: Dict):
+        # 每个任务有独立的上下文，追踪 ID 互不影响
+        new_trace_id(message.get("trace_id"))
+        try:
+            result = await self.scrape(
+                word,
+                {
+                    "timeout": message.get("timeout", 30000),
+                    "wait_until": message.get("wait_until", "domcontentloaded"),
+                    "cache": message.get("cache", True) is not False,
+                },
+            )
+        except Exception as e:
+            result = {"success": False, "word": word, "error": str(e)}
+
+        self.stats["completed"] += 1
+        credits = self._grant(1)
+        try:
+            await self._send({"type": "result", "id": request_id, "result": result, "credits": credits})
+        except Exception as e:
+            self._logger.warning(f"Failed to send result for {request_id}: {e}")
+
+    async def _flush_withheld(self):
+        """池容量恢复后归还暂缓的额度"""
+        while True:
+            await asyncio.sleep(0.2)
+            if self.withheld and self._has_capacity():
+                granted = self._grant(0)
+                if not granted:
+                    continue
+                try:
+                    await self._send({"type": "credit", "credits": granted})
+                except Exception as e:
+                    self._logger.warning(f"Failed to send {granted} withheld credits: {e}")